@@ -1,28 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import os
+import json
+import hashlib
+import hmac
+import multiprocessing
 import random
 import string
+import tempfile
 import time
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
-from io import BytesIO
-
-try:
-    from PyPDF2 import PdfReader
-except Exception:
-    PdfReader = None
-try:
-    import docx
-except Exception:
-    docx = None
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from catalog import Catalog, normalize_value
+from caches import LRUCache, ResumeCache
+from scoring_pool import ScoringPool
+from mailer import MailDispatcher
+from metrics import Metrics, StageTimer, current_timer, server_timing, stage
+from profiler import Profiler
+from html_templates import CONFIRMATION_DOCUMENT, CONFIRMATION_EMAIL, OTP_EMAIL
+from otp_store import EXPIRED, LOCKED, MISSING, VERIFIED, MemoryOTPStore, SQLiteOTPStore
+from rate_limit import TokenBucketLimiter
+from resume_parser import ParsePool, ParserBusy, ProfileExtractor, text_format
 
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag', 'X-Total-Count', 'X-Dataset-Version', 'Server-Timing'])
+
+# Per-stage request timings for /api/metrics, and optionally as Server-Timing headers
+# (formatting the header costs more per request than the rest of the metrics together)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+metrics = Metrics()
 
 # Import email configuration
 try:
@@ -37,6 +48,22 @@ except ImportError:
         'sender_name': 'PM Internship Recommender'
     }
 
+# Point mail at another server, e.g. a local SMTP stand-in: SMTP_SERVER=localhost SMTP_PORT=8025 SMTP_USE_TLS=0 SMTP_LOGIN=0
+EMAIL_CONFIG = {
+    **EMAIL_CONFIG,
+    'smtp_server': os.getenv('SMTP_SERVER', EMAIL_CONFIG['smtp_server']),
+    'smtp_port': int(os.getenv('SMTP_PORT', EMAIL_CONFIG['smtp_port'])),
+    'use_tls': os.getenv('SMTP_USE_TLS', str(int(EMAIL_CONFIG.get('use_tls', True)))) == '1',
+    'use_ssl': os.getenv('SMTP_USE_SSL', str(int(EMAIL_CONFIG.get('use_ssl', False)))) == '1',
+    'login': os.getenv('SMTP_LOGIN', str(int(EMAIL_CONFIG.get('login', True)))) == '1',
+}
+mailer = MailDispatcher(EMAIL_CONFIG, workers=int(os.getenv('MAIL_WORKERS', '2')),
+                        observe=metrics.observe_smtp if METRICS_ENABLED else None)
+
+
+def submitted_at() -> str:
+    return datetime.now().strftime('%B %d, %Y at %I:%M %p')
+
 
 # CSV schema columns expected (updated to new format)
 COLUMN_NAMES = [
@@ -65,232 +92,627 @@ def load_dataset(csv_path: str) -> pd.DataFrame:
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 DEFAULT_DATASET_PATH = os.path.join(ROOT_DIR, 'pm_internships.csv')
 DATASET_PATH = os.getenv('INTERNSHIP_DATASET_PATH', DEFAULT_DATASET_PATH)
-df = load_dataset(DATASET_PATH)
-
-
-def preprocess_sets(s):
-    if pd.notna(s) and isinstance(s, str):
-        return set(x.strip().lower() for x in s.split(','))
-    return set()
-
-
-def score_internship(internship: pd.Series, user: dict):
-    loc_match = 1 if str(internship.get('location', '')).strip().lower() == str(user.get('location', '')).strip().lower() else 0
-
-    # Category now replaces sectors; treat category as a single-item set for overlap logic
-    intern_sectors = preprocess_sets(internship.get('category', ''))
-    user_sectors = set([x.strip().lower() for x in user.get('sectors', [])])
-    sector_match_norm = len(user_sectors & intern_sectors) / len(intern_sectors) if intern_sectors else 0
-
-    # Skills column name updated
-    intern_skills = preprocess_sets(internship.get('skills', ''))
-    user_skills = set([x.strip().lower() for x in user.get('skills', [])])
-    skill_match_norm = len(user_skills & intern_skills) / len(intern_skills) if intern_skills else 0
-
-    # Education column name updated
-    edu_req = str(internship.get('education', '')).strip().lower()
-    edu_match = 1 if str(user.get('education', '')).strip().lower() in edu_req else 0
-
-    # Preserve priority logic/weights
-    score = (0.45 * loc_match) + (0.35 * sector_match_norm) + (0.15 * skill_match_norm) + (0.05 * edu_match)
-    return score, loc_match
-
-
-def recommend_internships(user: dict, frame: pd.DataFrame, top_k_local: int = 5, top_k_overall: int = 10):
-    scores = []
-    for _, internship in frame.iterrows():
-        score, loc_match = score_internship(internship, user)
-        scores.append((
-            internship.get('internship_id'),
-            internship.get('title'),
-            internship.get('location'),
-            float(score),
-            int(loc_match),
-            internship.get('skills', ''),
-            internship.get('description', ''),
-            internship.get('category', ''),
-        ))
-
-    local_recs = [s for s in scores if s[4] == 1]
-    overall_recs = scores
-
-    local_sorted = sorted(local_recs, key=lambda x: x[3], reverse=True)[:top_k_local]
-    overall_sorted = sorted(overall_recs, key=lambda x: x[3], reverse=True)[:top_k_overall]
-
-    def to_obj(t):
-        skills_list = [x.strip() for x in str(t[5]).split(',') if x.strip()] if t[5] else []
-        return {
-            'id': int(t[0]) if pd.notna(t[0]) else None,
-            'title': str(t[1]) if pd.notna(t[1]) else '',
-            'location': str(t[2]) if pd.notna(t[2]) else '',
-            'matchScore': int(round(t[3] * 100)),
-            'skills': skills_list,
-            'description': str(t[6]) if pd.notna(t[6]) else '',
-            'category': (str(t[7]).split(',')[0].strip() if t[7] else '') or 'Technology',
-            # Use dataset values when available from main frame (fallbacks in list endpoints)
-            'company': str(frame.loc[frame['internship_id'] == t[0]].iloc[0].get('company', 'Company')) if 'company' in frame.columns and not frame.empty else 'Company',
-            'stipend': int(frame.loc[frame['internship_id'] == t[0]].iloc[0].get('stipend', 0)) if 'stipend' in frame.columns and not frame.empty else 0,
-            'duration': str(frame.loc[frame['internship_id'] == t[0]].iloc[0].get('duration', '3 months')) if 'duration' in frame.columns and not frame.empty else '3 months',
-        }
+# Prebuilt binary catalog (see build_snapshot.py); the CSV is the fallback
+SNAPSHOT_PATH = os.getenv('INTERNSHIP_SNAPSHOT_PATH', os.path.splitext(DATASET_PATH)[0] + '.catalog')
+
 
-    return [to_obj(x) for x in local_sorted], [to_obj(x) for x in overall_sorted]
+def load_catalog(csv_path: str, snapshot_path: str) -> Catalog:
+    """Memory-map the snapshot when it is at least as new as the CSV, else parse the CSV"""
+    if os.path.exists(snapshot_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(snapshot_path) >= os.path.getmtime(csv_path)
+    ):
+        try:
+            return Catalog.load_snapshot(snapshot_path)
+        except Exception as e:
+            print(f"Failed to load catalog snapshot {snapshot_path}: {e}")
+    return Catalog(load_dataset(csv_path))
+
+
+catalog = load_catalog(DATASET_PATH, SNAPSHOT_PATH)
+
+# Identical profiles are common, so recommendation results are cached per dataset version
+RECOMMEND_CACHE_SIZE = int(os.getenv('RECOMMEND_CACHE_SIZE', '2048'))
+recommend_cache = LRUCache(RECOMMEND_CACHE_SIZE)
+
+DEFAULT_PAGE_LIMIT = 50
+RANKINGS = ('weighted', 'similarity')
+# Profiles scored together per step of /api/recommend/batch
+BATCH_LINES = 1024
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+# Seconds between dataset file checks; 0 disables the watcher
+DATASET_WATCH_INTERVAL = float(os.getenv('DATASET_WATCH_INTERVAL', '0'))
+_reload_lock = threading.Lock()
+
+# Pool workers start from a fork server (spawned where there is none) rather than forking this
+# threaded process, which can deadlock and would hand every worker a copy of its heap
+WORKER_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+if WORKER_CONTEXT.get_start_method() == 'forkserver':
+    WORKER_CONTEXT.set_forkserver_preload(['catalog', 'resume_parser'])
+
+# Worker processes for scoring; 0 keeps scoring in the request thread
+SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', '0'))
+# Single recommendations are only split across workers for catalogs this large
+SCORING_POOL_MIN_ROWS = int(os.getenv('SCORING_POOL_MIN_ROWS', '200000'))
+_scoring_pool = None
+_scoring_pool_lock = threading.Lock()
+_profile_extractor = None
+
+# Sampling profiler: PROFILE_SAMPLE_RATE (0-1) profiles that share of requests, and with an
+# ADMIN_TOKEN set, "X-Profile: collapsed" or "X-Profile: speedscope" plus X-Admin-Token profiles one
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_FORMAT = os.getenv('PROFILE_FORMAT', 'collapsed')
+profiler = Profiler(
+    os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'pm-internship-profiles')),
+    interval=float(os.getenv('PROFILE_INTERVAL_MS', '1')) / 1000,
+    max_files=int(os.getenv('PROFILE_MAX_FILES', '200')),
+)
+
+# Resume text extraction runs in its own processes, capped in size, pages and time
+RESUME_WORKERS = int(os.getenv('RESUME_WORKERS', '2'))
+RESUME_QUEUE_SIZE = int(os.getenv('RESUME_QUEUE_SIZE', '8'))
+RESUME_TIMEOUT = float(os.getenv('RESUME_TIMEOUT', '10'))
+RESUME_MAX_BYTES = int(os.getenv('RESUME_MAX_BYTES', str(5 * 2**20)))
+RESUME_MAX_PAGES = int(os.getenv('RESUME_MAX_PAGES', '20'))
+RESUME_MAX_CHARS = int(os.getenv('RESUME_MAX_CHARS', '50000'))
+RESUME_RETRY_AFTER = 5
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+# Parsed profiles by upload hash; RESUME_CACHE_DIR adds a disk tier shared across workers and restarts
+resume_cache = ResumeCache(
+    int(os.getenv('RESUME_CACHE_SIZE', '512')),
+    os.getenv('RESUME_CACHE_DIR', ''),
+    int(os.getenv('RESUME_CACHE_FILES', '10000')),
+)
+
+
+def use_catalog() -> Catalog:
+    """Pin the current catalog for this request; reloads swap the global, not this reference"""
+    g.catalog = catalog
+    return g.catalog
+
+
+def is_admin() -> bool:
+    """X-Admin-Token matches ADMIN_TOKEN, compared in constant time; never true when no token is set"""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(
+        request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()
+    )
+
+
+def reload_catalog() -> Catalog:
+    """Build a new catalog off to the side, then swap it in with one assignment"""
+    global catalog
+    with _reload_lock:
+        new_catalog = load_catalog(DATASET_PATH, SNAPSHOT_PATH)
+        catalog = new_catalog
+        recommend_cache.clear()
+    print(f"Dataset reloaded: {new_catalog.size} internships, version {new_catalog.version}")
+    return new_catalog
+
+
+def start_background_reload() -> bool:
+    """Reload in a daemon thread; False if a reload is already running"""
+    if _reload_lock.locked():
+        return False
+    threading.Thread(target=reload_catalog, name='dataset-reload', daemon=True).start()
+    return True
 
 
-def extract_profile_from_text(text: str) -> dict:
-    text_lc = text.lower() if text else ''
-    skills_vocab = [
-        'javascript','react','node.js','mongodb','python','java','html','css','express',
-        'machine learning','ai','data analysis','sql','nosql','aws','docker','kubernetes',
-        'git','rest api','project management','analytical thinking','communication','leadership'
-    ]
-    locations = ['delhi','bangalore','hyderabad','jaipur','mumbai','chennai','pune','kolkata','ahmedabad','gurgaon','noida','remote']
-    degrees = ['bachelor','master','phd','b.tech','m.tech','b.e.','m.e.','bsc','msc','ba','ma','mbbs','bca','mca']
-
-    skills = [s for s in skills_vocab if s in text_lc]
-    location = next((c for c in locations if c in text_lc), 'remote')
-    import re
-    exp = 0
-    for pat in [r'(\d+)\s*(years?|yrs?)', r'experience.*?(\d+)', r'(\d+)\+?\s*years?']:
-        m = re.search(pat, text_lc)
-        if m:
+def _dataset_mtimes():
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (DATASET_PATH, SNAPSHOT_PATH))
+
+
+def watch_dataset(interval: float):
+    """Poll the CSV and snapshot mtimes and reload when either changes"""
+    seen = _dataset_mtimes()
+    while True:
+        time.sleep(interval)
+        mtimes = _dataset_mtimes()
+        if mtimes != seen:
+            seen = mtimes
             try:
-                exp = int(m.group(1))
-                break
-            except Exception:
-                pass
-    education = next((d for d in degrees if d in text_lc), 'bachelor')
-    return {
-        'skills': skills,
-        'location': location,
-        'experience': exp,
-        'education': education,
-    }
+                reload_catalog()
+            except Exception as e:
+                print(f"Dataset reload failed: {e}")
+
+
+if DATASET_WATCH_INTERVAL > 0:
+    threading.Thread(target=watch_dataset, args=(DATASET_WATCH_INTERVAL,), name='dataset-watch', daemon=True).start()
+
+
+def scoring_pool(current: Catalog):
+    """Worker pool for this catalog version, started on first use and acquired for the caller,
+    who must release() it; None when disabled or when `current` has since been replaced"""
+    global _scoring_pool
+    if SCORING_WORKERS < 1 or current.empty or current is not catalog:
+        return None
+    with _scoring_pool_lock:
+        if _scoring_pool is None or _scoring_pool.version != current.version:
+            if _scoring_pool is not None:
+                _scoring_pool.close()
+            _scoring_pool = ScoringPool(current, SCORING_WORKERS, published=SNAPSHOT_PATH, mp_context=WORKER_CONTEXT)
+        return _scoring_pool.acquire()
+
+
+@app.after_request
+def add_dataset_version(response):
+    if 'catalog' in g:
+        response.headers['X-Dataset-Version'] = g.catalog.version
+    return response
+
+
+@app.before_request
+def start_profile():
+    if not (PROFILE_SAMPLE_RATE or ADMIN_TOKEN):
+        return
+    requested = request.headers.get('X-Profile')
+    if requested and is_admin():
+        g.profile = profiler.start(request.endpoint or 'unmatched', requested)
+        g.profile_requested = True
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        g.profile = profiler.start(request.endpoint or 'unmatched', PROFILE_FORMAT)
+
+
+@app.after_request
+def finish_profile(response):
+    """Runs after record_timings, so writing the profile stays out of the request's timings"""
+    if not (PROFILE_SAMPLE_RATE or ADMIN_TOKEN):
+        return response
+    session = g.pop('profile', None)
+    if session is not None:
+        path = profiler.stop(session)
+        if path and g.get('profile_requested'):
+            response.headers['X-Profile-File'] = os.path.basename(path)
+    return response
+
+
+@app.teardown_request
+def abandon_profile(_exc):
+    # An exception skipped after_request: still write what was sampled
+    if not (PROFILE_SAMPLE_RATE or ADMIN_TOKEN):
+        return
+    session = g.pop('profile', None)
+    if session is not None:
+        profiler.stop(session)
+
+
+@app.before_request
+def start_timer():
+    if METRICS_ENABLED:
+        current_timer.set(StageTimer())
+
+
+@app.after_request
+def record_timings(response):
+    """Time since the last stage counts as "respond"; a streamed body is timed only until it is returned"""
+    timer = current_timer.get()
+    if timer is not None:
+        metrics.record(request.endpoint or 'unmatched', response.status_code, timer)
+        if SERVER_TIMING:
+            response.headers.add('Server-Timing', server_timing(timer))
+    return response
+
+
+@app.teardown_request
+def clear_timer(_exc):
+    # Also runs when an exception skipped after_request, so no timer outlives its request
+    current_timer.set(None)
+
+
+def recommend_internships(user: dict, catalog: Catalog, top_k_local: int = 5, top_k_overall: int = 10,
+                          pool: ScoringPool = None, similarity: bool = False):
+    if similarity:
+        ranked = catalog.rank(user, top_k_local, top_k_overall, similarity=True)
+    else:
+        ranker = pool if pool is not None and catalog.size >= SCORING_POOL_MIN_ROWS else catalog
+        ranked = ranker.rank(user, top_k_local, top_k_overall)
+    stage('score')
+    (local_rows, local_scores), (overall_rows, overall_scores) = ranked
+    local_recs = [catalog.result(i, s) for i, s in zip(local_rows, local_scores)]
+    overall_recs = [catalog.result(i, s) for i, s in zip(overall_rows, overall_scores)]
+    stage('results')
+    return local_recs, overall_recs
+
+
+def recommend_cache_key(user: dict, version: str, ranking: str = 'weighted') -> tuple:
+    """Canonical form of a profile: the same key for any profile that scores identically."""
+    return (
+        version,
+        ranking,
+        normalize_value(user.get('location', '')),
+        tuple(sorted(set(x.strip().lower() for x in user.get('sectors', [])))),
+        tuple(sorted(set(x.strip().lower() for x in user.get('skills', [])))),
+        normalize_value(user.get('education', '')),
+    )
+
+
+def profile_extractor(current: Catalog) -> ProfileExtractor:
+    """Resume term matcher for this catalog's vocabulary, rebuilt when the dataset changes"""
+    global _profile_extractor
+    extractor = _profile_extractor
+    if extractor is None or extractor.version != current.version:
+        extractor = _profile_extractor = ProfileExtractor.from_catalog(current)
+    return extractor
+
+
+def parse_pool() -> ParsePool:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ParsePool(RESUME_WORKERS, RESUME_QUEUE_SIZE, RESUME_TIMEOUT, RESUME_MAX_PAGES, RESUME_MAX_CHARS,
+                                    mp_context=WORKER_CONTEXT)
+        return _parse_pool
+
+
+def extract_profile_from_text(text: str, current: Catalog = None) -> dict:
+    return profile_extractor(current or catalog).extract(text)
 
 
 @app.route('/api/health', methods=['GET'])
 def health():
+    current = use_catalog()
     return jsonify({
         'status': 'ok', 
-        'dataset_loaded': not df.empty, 
-        'rows': int(len(df)),
+        'dataset_loaded': not current.empty,
+        'rows': current.size,
         'email_configured': EMAIL_CONFIG['sender_email'] != 'your-email@gmail.com',
+        'dataset_version': current.version,
+        'recommend_cache': recommend_cache.stats(),
+        'scoring_workers': SCORING_WORKERS,
+        'resume_cache': resume_cache.stats(),
+        'mail': mailer.stats(),
+        'otp_store': otp_store.stats(),
+        'profiler': profiler.stats(),
+        'otp_rate_limits': {
+            'email': otp_email_limiter.stats(),
+            'ip': otp_ip_limiter.stats(),
+            'coalesced': otp_coalesced,
+        },
         'endpoints': [
             '/api/health',
+            '/api/metrics',
             '/api/upload-resume',
             '/api/recommend',
+            '/api/recommend/batch',
             '/api/internships',
+            '/api/internships?ids=<id>,<id>',
             '/api/internships/<id>',
+            '/api/search?q=<query>',
             '/api/internships/<id>/apply',
             '/api/applications',
             '/api/applications/send-confirmation',
             '/api/applications/download-confirmation',
             '/api/auth/send-otp',
             '/api/auth/verify-otp',
-            '/api/auth/resend-otp'
+            '/api/auth/resend-otp',
+            '/api/admin/reload'
         ]
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text format: request/stage latency histograms, caches, dataset, mail and OTP state"""
+    current = use_catalog()
+    caches = [('recommend', recommend_cache.stats()), ('resume', resume_cache.stats())]
+    mail = mailer.stats()
+    gauges = [
+        ('pm_dataset_rows', 'Internships in the loaded catalog', 'gauge', [({}, current.size)]),
+        ('pm_dataset_info', 'Loaded catalog version', 'gauge', [({'version': current.version}, 1)]),
+        ('pm_cache_entries', 'Entries held per cache', 'gauge', [({'cache': n}, c['size']) for n, c in caches]),
+        ('pm_cache_hits_total', 'Cache hits', 'counter', [({'cache': n}, c['hits']) for n, c in caches]),
+        ('pm_cache_misses_total', 'Cache misses', 'counter', [({'cache': n}, c['misses']) for n, c in caches]),
+        ('pm_cache_evictions_total', 'Cache evictions', 'counter', [({'cache': n}, c['evictions']) for n, c in caches]),
+        ('pm_mail_queue_depth', 'Mail queued, waiting for a retry or being sent', 'gauge', [({}, mailer.depth())]),
+        ('pm_mail_total', 'Mail by outcome', 'counter',
+         [({'outcome': k}, mail[k]) for k in ('sent', 'failed', 'retried')]),
+        ('pm_smtp_connections_total', 'SMTP connections opened', 'counter', [({}, mail['connections'])]),
+        ('pm_otp_codes', 'OTP codes currently stored', 'gauge', [({}, otp_store.stats()['size'])]),
+        ('pm_otp_throttled_total', 'OTP sends refused by rate limit', 'counter',
+         [({'limit': 'email'}, otp_email_limiter.stats()['throttled']), ({'limit': 'ip'}, otp_ip_limiter.stats()['throttled'])]),
+        ('pm_otp_coalesced_total', 'OTP sends answered with the pending code', 'counter', [({}, otp_coalesced)]),
+    ]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/upload-resume', methods=['POST'])
 def upload_resume():
+    if request.content_length and request.content_length > RESUME_MAX_BYTES + 64 * 1024:
+        return jsonify({'error': 'file too large'}), 413
     if 'file' not in request.files:
         return jsonify({'error': 'file field is required'}), 400
     f = request.files['file']
+    content = f.stream.read(RESUME_MAX_BYTES + 1)
+    if len(content) > RESUME_MAX_BYTES:
+        return jsonify({'error': 'file too large'}), 413
+    stage('upload')
+
+    current = use_catalog()
+    # The profile depends on the bytes, the extractor the file name selects and the dataset vocabulary
+    key = f"{hashlib.sha256(content).hexdigest()}-{text_format(f.filename)}-{current.version}"
+    profile = resume_cache.get(key)
+    stage('cache')
+    if profile is not None:
+        return jsonify(profile)
+
+    started = time.perf_counter()
     try:
-        filename = (f.filename or '').lower()
-        content = f.read()
-        text = ''
-        if filename.endswith('.pdf') and PdfReader is not None:
-            try:
-                reader = PdfReader(BytesIO(content))
-                for page in reader.pages:
-                    text += (page.extract_text() or '') + '\n'
-            except Exception:
-                text = ''
-        elif (filename.endswith('.docx') or filename.endswith('.doc')) and docx is not None:
-            try:
-                document = docx.Document(BytesIO(content))
-                text = '\n'.join([p.text for p in document.paragraphs])
-            except Exception:
-                text = ''
-        else:
-            # Fallback: treat as plain text
-            try:
-                text = content.decode('utf-8', errors='ignore')
-            except Exception:
-                text = ''
+        text = parse_pool().extract_text(f.filename, content)
+    except (ParserBusy, BrokenProcessPool):
+        # Also when the job's workers were killed (twice) for another job's overrun: not a parse result
+        response = jsonify({'error': 'resume parser busy, try again shortly'})
+        response.headers['Retry-After'] = str(RESUME_RETRY_AFTER)
+        return response, 503
+    except TimeoutError:
+        return jsonify({'error': 'resume parsing timed out'}), 504
     except Exception:
-        text = ''
+        # Not cached: the failure may be transient
+        return jsonify(extract_profile_from_text('', current))
+    stage('extract_text')
 
-    profile = extract_profile_from_text(text)
+    profile = extract_profile_from_text(text, current)
+    stage('profile')
+    resume_cache.put(key, profile, time.perf_counter() - started)
     return jsonify(profile)
 
 
-@app.route('/api/recommend', methods=['POST'])
-def recommend():
-    data = request.get_json(force=True, silent=True) or {}
-    user = {
+def user_from_payload(data: dict) -> dict:
+    return {
         'location': data.get('location', ''),
         'skills': data.get('skills', []),
         'sectors': data.get('sectors', []),
         'education': data.get('education', ''),
     }
 
-    if df.empty:
+
+def valid_user(user: dict) -> bool:
+    return (
+        isinstance(user['location'], str)
+        and isinstance(user['education'], str)
+        and all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in (user['skills'], user['sectors']))
+    )
+
+
+def iter_batch_recommendations(lines, catalog: Catalog, top_k_local: int = 5, top_k_overall: int = 10, pool: ScoringPool = None):
+    """Read NDJSON profiles and yield NDJSON results in input order, BATCH_LINES profiles at a time.
+
+    Each result line carries the input `line` number (and the profile's `id`
+    when given) plus `local`/`overall` lists, or an `error` for a bad line.
+    With a pool, each step's profiles are split across its workers.
+    """
+    pending = []
+    ranker = pool if pool is not None else catalog
+
+    def flush():
+        users = [user for _, _, user in pending if user is not None]
+        ranked = iter(ranker.rank_many(users, top_k_local, top_k_overall))
+        out = []
+        for line_no, data, user in pending:
+            head = {'line': line_no}
+            if isinstance(data, dict) and 'id' in data:
+                head['id'] = data['id']
+            if user is None:
+                head['error'] = 'invalid profile'
+                out.append(json.dumps(head).encode() + b'\n')
+                continue
+            (local_rows, local_scores), (overall_rows, overall_scores) = next(ranked)
+            out.append(
+                json.dumps(head)[:-1].encode()
+                + b', "local": ' + catalog.results_json(local_rows, local_scores)
+                + b', "overall": ' + catalog.results_json(overall_rows, overall_scores)
+                + b'}\n'
+            )
+        pending.clear()
+        return b''.join(out)
+
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        user = user_from_payload(data) if isinstance(data, dict) else None
+        pending.append((line_no, data, user if user is not None and valid_user(user) else None))
+        if len(pending) >= BATCH_LINES:
+            yield flush()
+    if pending:
+        yield flush()
+
+
+@app.route('/api/recommend', methods=['POST'])
+def recommend():
+    data = request.get_json(force=True, silent=True) or {}
+    user = user_from_payload(data)
+
+    # "weighted" (default) is the original score; "similarity" blends in TF-IDF skill/sector similarity
+    ranking = data.get('ranking', 'weighted')
+    if ranking not in RANKINGS:
+        return jsonify({'error': f"ranking must be one of {', '.join(RANKINGS)}"}), 400
+
+    current = use_catalog()
+    if current.empty:
         return jsonify({'local': [], 'overall': [], 'message': 'dataset not loaded'}), 200
+    stage('parse')
 
-    local_recs, overall_recs = recommend_internships(user, df)
+    key = recommend_cache_key(user, current.version, ranking)
+    cached = recommend_cache.get(key)
+    stage('cache')
+    if cached is None:
+        pool = scoring_pool(current) if current.size >= SCORING_POOL_MIN_ROWS and ranking == 'weighted' else None
+        try:
+            cached = recommend_internships(user, current, pool=pool, similarity=ranking == 'similarity')
+        finally:
+            if pool is not None:
+                pool.release()
+        recommend_cache.put(key, cached)
+    local_recs, overall_recs = cached
     return jsonify({'local': local_recs, 'overall': overall_recs})
 
 
+@app.route('/api/recommend/batch', methods=['POST'])
+def recommend_batch():
+    """Recommend for NDJSON profiles (one JSON object per line); streams NDJSON results"""
+    current = use_catalog()
+    lines = (line.decode('utf-8', errors='replace') for line in request.stream)
+    pool = scoring_pool(current)
+    response = Response(stream_with_context(iter_batch_recommendations(lines, current, pool=pool)), mimetype='application/x-ndjson')
+    if pool is not None:
+        # Held until the stream is closed, finished or not
+        response.call_on_close(pool.release)
+    return response
+
+
+FILTER_PARAMS = ('location', 'category', 'skills', 'skills[]', 'education', 'duration', 'minStipend', 'maxStipend',
+                 'stipendRange', 'stipendRange[]')
+
+
+def page_bounds(total: int, paged: bool = False):
+    """(start, stop) from `page`/`limit` query params; everything when neither is given unless `paged`"""
+    page = request.args.get('page', type=int)
+    limit = request.args.get('limit', type=int)
+    if page is None and limit is None and not paged:
+        return 0, total
+    page = 1 if page is None else page
+    limit = DEFAULT_PAGE_LIMIT if limit is None else limit
+    if page < 1 or limit < 1:
+        return None
+    start = (page - 1) * limit
+    return start, start + limit
+
+
+def cacheable(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
 @app.route('/api/internships', methods=['GET'])
 def list_internships():
-    if df.empty:
-        return jsonify([])
-
-    def to_obj_row(row: pd.Series):
-        skills_list = [x.strip() for x in str(row.get('skills', '')).split(',') if x.strip()]
-        category = (str(row.get('category', '')).split(',')[0].strip() if row.get('category', '') else '') or 'Technology'
-        return {
-            'id': int(row.get('internship_id')) if pd.notna(row.get('internship_id')) else None,
-            'title': str(row.get('title', '')) if pd.notna(row.get('title')) else '',
-            'location': str(row.get('location', '')) if pd.notna(row.get('location')) else '',
-            'matchScore': None,
-            'skills': skills_list,
-            'description': str(row.get('description', '')) if pd.notna(row.get('description')) else '',
-            'category': category,
-            'company': str(row.get('company', 'Company')) if pd.notna(row.get('company')) else 'Company',
-            'stipend': int(row.get('stipend', 0)) if pd.notna(row.get('stipend')) and str(row.get('stipend', '')).strip() != '' else 0,
-            'duration': str(row.get('duration', '3 months')) if pd.notna(row.get('duration')) else '3 months',
-        }
-
-    internships = [to_obj_row(row) for _, row in df.iterrows()]
-    return jsonify(internships)
+    """List internships; `page`/`limit` select a slice, ETag allows 304 revalidation
+
+    Filter params (location, category, skills, education, duration,
+    minStipend, maxStipend, or stipendRange[] as min and max) narrow the
+    list; the response is still an array.
+    `envelope=1` returns {"items": [...], "total": n, "facets": {...}} instead.
+    """
+    current = use_catalog()
+    ids = request.args.get('ids')
+    if ids is not None:
+        return get_internships_batch([x.strip() for x in ids.split(',') if x.strip()])
+    if request.args.get('envelope') == '1' or any(p in request.args for p in FILTER_PARAMS):
+        return filter_internships(current)
+
+    bounds = page_bounds(current.size)
+    if bounds is None:
+        return jsonify({'error': 'page and limit must be positive integers'}), 400
+    start, stop = bounds
+
+    response = Response(current.listing_page(start, stop), mimetype='application/json')
+    stage('page')
+    response.headers['X-Total-Count'] = str(current.size)
+    return cacheable(response, f'{current.version}-{start}-{stop}')
+
+
+def filter_internships(current: Catalog):
+    """Filtered page of internships; with envelope=1, wrapped with the total and facet counts over all matches"""
+    skills = []
+    for raw in request.args.getlist('skills') + request.args.getlist('skills[]'):
+        skills.extend(x.strip() for x in raw.split(',') if x.strip())
+    min_stipend = request.args.get('minStipend', type=int)
+    max_stipend = request.args.get('maxStipend', type=int)
+    # The frontend's filter state serializes its stipend slider as stipendRange[]=min&stipendRange[]=max
+    stipend_range = request.args.getlist('stipendRange[]') or request.args.getlist('stipendRange')
+    if stipend_range:
+        try:
+            low, high = (int(x) for x in stipend_range)
+        except ValueError:
+            return jsonify({'error': 'stipendRange needs two integers: min and max'}), 400
+        min_stipend = low if min_stipend is None else min_stipend
+        max_stipend = high if max_stipend is None else max_stipend
+    rows = current.filter(
+        location=request.args.get('location'),
+        category=request.args.get('category'),
+        skills=skills,
+        education=request.args.get('education'),
+        duration=request.args.get('duration'),
+        min_stipend=min_stipend,
+        max_stipend=max_stipend,
+    )
+    stage('filter')
+
+    bounds = page_bounds(len(rows))
+    if bounds is None:
+        return jsonify({'error': 'page and limit must be positive integers'}), 400
+    start, stop = bounds
+
+    if request.args.get('envelope') == '1':
+        # Facets and total are small; the page of cards is spliced in from prebuilt JSON
+        meta = json.dumps({'total': int(len(rows)), 'facets': current.facets(rows)}, separators=(',', ':'))
+        stage('facets')
+        body = meta[:-1].encode() + b',"items":' + current.cards_json(rows[start:stop]) + b'}'
+    else:
+        body = current.cards_json(rows[start:stop])
+    stage('cards')
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Total-Count'] = str(len(rows))
+    query = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return cacheable(response, f'{current.version}-{query}')
+
+
+def get_internships_batch(ids):
+    """Cards for several ids in request order; unknown ids are skipped"""
+    current = use_catalog()
+    rows = [current.find(x) for x in ids]
+    return Response(current.cards_json(row for row in rows if row >= 0), mimetype='application/json')
+
+
+@app.route('/api/search', methods=['GET'])
+def search_internships():
+    """Keyword search over title, company, skills and description, best BM25 match first
+
+    `q` is the query; `page`/`limit` select the page (default limit 50).
+    Returns {"query": q, "total": n, "items": [...]}.
+    """
+    current = use_catalog()
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    bounds = page_bounds(0, paged=True)
+    if bounds is None:
+        return jsonify({'error': 'page and limit must be positive integers'}), 400
+    start, stop = bounds
+
+    total, rows, _ = current.search(query, start, stop)
+    stage('search')
+    meta = json.dumps({'query': query, 'total': total}, separators=(',', ':'))
+    response = Response(meta[:-1].encode() + b',"items":' + current.cards_json(rows) + b'}', mimetype='application/json')
+    response.headers['X-Total-Count'] = str(total)
+    return cacheable(response, f'{current.version}-{hashlib.sha1(request.query_string).hexdigest()[:12]}')
 
 
 @app.route('/api/internships/<id>', methods=['GET'])
 def get_internship(id):
-    if df.empty:
-        return jsonify({'error': 'not found'}), 404
-    match = df[df['internship_id'].astype(str) == str(id)]
-    if match.empty:
+    current = use_catalog()
+    row = current.find(id)
+    if row < 0:
         return jsonify({'error': 'not found'}), 404
-    row = match.iloc[0]
-    skills_list = [x.strip() for x in str(row.get('skills', '')).split(',') if x.strip()]
-    category = (str(row.get('category', '')).split(',')[0].strip() if row.get('category', '') else '') or 'Technology'
-    obj = {
-        'id': int(row.get('internship_id')) if pd.notna(row.get('internship_id')) else None,
-        'title': str(row.get('title', '')) if pd.notna(row.get('title')) else '',
-        'location': str(row.get('location', '')) if pd.notna(row.get('location')) else '',
-        'matchScore': None,
-        'skills': skills_list,
-        'description': str(row.get('description', '')) if pd.notna(row.get('description')) else '',
-        'category': category,
-        'company': str(row.get('company', 'Company')) if pd.notna(row.get('company')) else 'Company',
-        'stipend': int(row.get('stipend', 0)) if pd.notna(row.get('stipend')) and str(row.get('stipend', '')).strip() != '' else 0,
-        'duration': str(row.get('duration', '3 months')) if pd.notna(row.get('duration')) else '3 months',
-    }
-    return jsonify(obj)
+    return Response(current.card_json(row), mimetype='application/json')
+
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """Rebuild the catalog from disk in the background (requires X-Admin-Token)"""
+    if not is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+    started = start_background_reload()
+    return jsonify({
+        'status': 'reloading' if started else 'already reloading',
+        'dataset_version': use_catalog().version,
+    }), 202
 
 
 @app.route('/api/internships/<id>/apply', methods=['POST'])
@@ -366,71 +788,21 @@ def send_confirmation_email():
             return jsonify({'error': 'Missing required fields'}), 400
         
         # Create confirmation email
-        msg = MIMEMultipart()
-        msg['From'] = f"{EMAIL_CONFIG['sender_name']} <{EMAIL_CONFIG['sender_email']}>"
-        msg['To'] = applicant_email
-        msg['Subject'] = f"Application Confirmation - {internship_title}"
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="margin: 0; font-size: 28px;">Application Received!</h1>
-                <p style="margin: 10px 0 0 0; opacity: 0.9;">Your internship application has been submitted</p>
-            </div>
-            
-            <div style="background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px;">
-                <h2 style="color: #333; margin-top: 0;">Application Details</h2>
-                <div style="background: white; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <p style="margin: 5px 0;"><strong>Application ID:</strong> {application_id}</p>
-                    <p style="margin: 5px 0;"><strong>Position:</strong> {internship_title}</p>
-                    <p style="margin: 5px 0;"><strong>Company:</strong> {company_name}</p>
-                    <p style="margin: 5px 0;"><strong>Status:</strong> <span style="color: #28a745;">Under Review</span></p>
-                    <p style="margin: 5px 0;"><strong>Submitted:</strong> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
-                </div>
-                
-                <p style="color: #666; line-height: 1.6;">
-                    Thank you for your interest in this position. We have received your application and will review it carefully. 
-                    You will be contacted within 5-7 business days regarding the next steps.
-                </p>
-                
-                <div style="background: #e3f2fd; border-left: 4px solid #2196f3; padding: 15px; margin: 20px 0;">
-                    <p style="margin: 0; color: #1976d2;"><strong>What's Next?</strong></p>
-                    <ul style="margin: 10px 0; color: #1976d2;">
-                        <li>Our team will review your application</li>
-                        <li>Shortlisted candidates will be contacted for interviews</li>
-                        <li>You'll receive updates via email</li>
-                    </ul>
-                </div>
-                
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
-                    <p style="color: #999; font-size: 12px; margin: 0;">
-                        This is an automated message. Please do not reply to this email.
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        # Send email
-        try:
-            server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-            server.starttls()
-            server.login(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'])
-            text = msg.as_string()
-            server.sendmail(EMAIL_CONFIG['sender_email'], applicant_email, text)
-            server.quit()
-            
-            print(f"Confirmation email sent to {applicant_email}")
-            return jsonify({'message': 'Confirmation email sent successfully'}), 200
-            
-        except Exception as email_error:
-            print(f"Failed to send confirmation email: {email_error}")
-            # Don't fail the application if email fails
-            return jsonify({'message': 'Application submitted, but confirmation email failed'}), 200
+        html_body = CONFIRMATION_EMAIL.render(
+            application_id=application_id,
+            internship_title=internship_title,
+            company_name=company_name,
+            submitted=submitted_at(),
+        )
+        stage('render')
+        
+        # Queue email; the dispatcher sends it in the background
+        queued = mailer.send(applicant_email, f"Application Confirmation - {internship_title}", html_body)
+        stage('queue_mail')
+        if queued:
+            return jsonify({'message': 'Confirmation email queued'}), 200
+        # Don't fail the application if email fails
+        return jsonify({'message': 'Application submitted, but confirmation email failed'}), 200
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -443,160 +815,17 @@ def download_confirmation():
         data = request.get_json()
         
         # Create a comprehensive HTML confirmation document
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Application Confirmation - {data.get('applicationId', 'N/A')}</title>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 800px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    background: #f8f9fa;
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 30px;
-                    border-radius: 10px 10px 0 0;
-                    text-align: center;
-                }}
-                .content {{
-                    background: white;
-                    padding: 30px;
-                    border-radius: 0 0 10px 10px;
-                    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                }}
-                .success-icon {{
-                    font-size: 48px;
-                    margin-bottom: 10px;
-                }}
-                .application-details {{
-                    background: #f8f9fa;
-                    border-left: 4px solid #007bff;
-                    padding: 20px;
-                    margin: 20px 0;
-                    border-radius: 5px;
-                }}
-                .detail-row {{
-                    display: flex;
-                    justify-content: space-between;
-                    margin: 10px 0;
-                    padding: 5px 0;
-                    border-bottom: 1px solid #eee;
-                }}
-                .detail-label {{
-                    font-weight: bold;
-                    color: #666;
-                }}
-                .detail-value {{
-                    color: #333;
-                }}
-                .status {{
-                    background: #d4edda;
-                    color: #155724;
-                    padding: 5px 10px;
-                    border-radius: 15px;
-                    font-size: 12px;
-                    font-weight: bold;
-                }}
-                .next-steps {{
-                    background: #fff3cd;
-                    border: 1px solid #ffeaa7;
-                    padding: 20px;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #eee;
-                    color: #666;
-                    font-size: 12px;
-                }}
-                @media print {{
-                    body {{ background: white; }}
-                    .header {{ background: #667eea !important; -webkit-print-color-adjust: exact; }}
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <div class="success-icon">✅</div>
-                <h1>Application Confirmation</h1>
-                <p>Your internship application has been successfully submitted</p>
-            </div>
-            
-            <div class="content">
-                <h2>Application Details</h2>
-                <div class="application-details">
-                    <div class="detail-row">
-                        <span class="detail-label">Application ID:</span>
-                        <span class="detail-value">{data.get('applicationId', 'N/A')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Position:</span>
-                        <span class="detail-value">{data.get('internshipTitle', 'N/A')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Company:</span>
-                        <span class="detail-value">{data.get('companyName', 'N/A')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Applicant:</span>
-                        <span class="detail-value">{data.get('applicantName', 'N/A')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Email:</span>
-                        <span class="detail-value">{data.get('applicantEmail', 'N/A')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Phone:</span>
-                        <span class="detail-value">{data.get('applicantPhone', 'N/A')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Submitted:</span>
-                        <span class="detail-value">{datetime.now().strftime('%B %d, %Y at %I:%M %p')}</span>
-                    </div>
-                    <div class="detail-row">
-                        <span class="detail-label">Status:</span>
-                        <span class="detail-value"><span class="status">Under Review</span></span>
-                    </div>
-                </div>
-                
-                <div class="next-steps">
-                    <h3>What happens next?</h3>
-                    <ul>
-                        <li>Our team will review your application within 5-7 business days</li>
-                        <li>Shortlisted candidates will be contacted for interviews</li>
-                        <li>You'll receive updates via email regarding your application status</li>
-                        <li>Keep this confirmation for your records</li>
-                    </ul>
-                </div>
-                
-                <p style="margin-top: 30px; font-size: 14px; color: #666;">
-                    <strong>Important:</strong> This is an automated confirmation. Please do not reply to this document. 
-                    If you have any questions, please contact our support team.
-                </p>
-            </div>
-            
-            <div class="footer">
-                <p>Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
-                <p>PM Internship Recommender System</p>
-            </div>
-        </body>
-        </html>
-        """
+        html_content = CONFIRMATION_DOCUMENT.render(
+            application_id=data.get('applicationId', 'N/A'),
+            internship_title=data.get('internshipTitle', 'N/A'),
+            company_name=data.get('companyName', 'N/A'),
+            applicant_name=data.get('applicantName', 'N/A'),
+            applicant_email=data.get('applicantEmail', 'N/A'),
+            applicant_phone=data.get('applicantPhone', 'N/A'),
+            submitted=submitted_at(),
+        )
         
         # Return HTML content that can be saved and opened in browser
-        from flask import Response
         return Response(
             html_content,
             mimetype='text/html',
@@ -609,76 +838,84 @@ def download_confirmation():
         return jsonify({'error': str(e)}), 500
 
 
-# OTP Storage (in production, use Redis or database)
-otp_storage = {}
+# OTP storage; set OTP_STORE_PATH to share codes between worker processes through SQLite
+OTP_TTL_SECONDS = 300
+OTP_MAX_ATTEMPTS = 3
+OTP_STORE_PATH = os.getenv('OTP_STORE_PATH', '')
+OTP_MAX_ENTRIES = int(os.getenv('OTP_MAX_ENTRIES', '100000'))
+otp_store = SQLiteOTPStore(OTP_STORE_PATH, OTP_MAX_ENTRIES) if OTP_STORE_PATH else MemoryOTPStore(OTP_MAX_ENTRIES)
+
+# Sends per email address and per client IP: a burst, then a steady rate per minute
+otp_email_limiter = TokenBucketLimiter(
+    float(os.getenv('OTP_EMAIL_PER_MINUTE', '1')) / 60, float(os.getenv('OTP_EMAIL_BURST', '3'))
+)
+otp_ip_limiter = TokenBucketLimiter(
+    float(os.getenv('OTP_IP_PER_MINUTE', '20')) / 60, float(os.getenv('OTP_IP_BURST', '20'))
+)
+# A repeat send within this many seconds reuses the pending code instead of mailing a new one
+OTP_COALESCE_SECONDS = float(os.getenv('OTP_COALESCE_SECONDS', '30'))
+otp_coalesced = 0
 
 def generate_otp():
     """Generate a 6-digit OTP"""
     return ''.join(random.choices(string.digits, k=6))
 
 def send_otp_email(email, otp):
-    """Send OTP via email"""
+    """Queue the OTP email; False if it could not be queued"""
+    def print_otp(_mail=None):
+        # Fallback: print to console for development
+        print(f"OTP for {email}: {otp}")
+
     try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = f"{EMAIL_CONFIG['sender_name']} <{EMAIL_CONFIG['sender_email']}>"
-        msg['To'] = email
-        msg['Subject'] = "Your Verification Code - PM Internship Recommender"
-        
         # Email body
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="margin: 0; font-size: 28px;">PM Internship Recommender</h1>
-                <p style="margin: 10px 0 0 0; opacity: 0.9;">Your verification code is ready</p>
-            </div>
-            
-            <div style="background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px;">
-                <h2 style="color: #333; margin-top: 0;">Email Verification</h2>
-                <p style="color: #666; line-height: 1.6;">
-                    Thank you for signing up! To complete your registration, please use the verification code below:
-                </p>
-                
-                <div style="background: white; border: 2px dashed #667eea; border-radius: 8px; padding: 20px; text-align: center; margin: 20px 0;">
-                    <div style="font-size: 32px; font-weight: bold; color: #667eea; letter-spacing: 5px; font-family: monospace;">
-                        {otp}
-                    </div>
-                </div>
-                
-                <p style="color: #666; font-size: 14px;">
-                    <strong>Important:</strong> This code will expire in 5 minutes. If you didn't request this code, please ignore this email.
-                </p>
-                
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
-                    <p style="color: #999; font-size: 12px; margin: 0;">
-                        This is an automated message. Please do not reply to this email.
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        msg.attach(MIMEText(html_body, 'html'))
+        html_body = OTP_EMAIL.render(otp=otp)
         
-        # Send email
-        server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-        server.starttls()
-        server.login(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'])
-        text = msg.as_string()
-        server.sendmail(EMAIL_CONFIG['sender_email'], email, text)
-        server.quit()
-        
-        print(f"OTP email sent successfully to {email}")
-        return True
+        if mailer.send(email, "Your Verification Code - PM Internship Recommender", html_body, on_failure=print_otp):
+            return True
+        print(f"Failed to queue OTP email to {email}")
+        print_otp()
+        return False
         
     except Exception as e:
         print(f"Failed to send OTP email to {email}: {str(e)}")
-        # Fallback: print to console for development
-        print(f"OTP for {email}: {otp}")
+        print_otp()
         return False
 
+def too_many_requests(retry_after: int):
+    response = jsonify({'error': 'Too many requests. Please try again later', 'retry_after': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def issue_otp(email: str, message: str):
+    """Rate-limit, then store and mail a new OTP, or reuse one sent moments ago"""
+    global otp_coalesced
+    stage('parse')
+    allowed, retry_after = otp_ip_limiter.allow(request.remote_addr or '')
+    if not allowed:
+        return too_many_requests(retry_after)
+    allowed, retry_after = otp_email_limiter.allow(email)
+    if not allowed:
+        return too_many_requests(retry_after)
+    stage('rate_limit')
+
+    otp = generate_otp()
+    stored = otp_store.put(email, otp, OTP_TTL_SECONDS, coalesce=OTP_COALESCE_SECONDS, max_attempts=OTP_MAX_ATTEMPTS)
+    stage('store')
+    if stored:
+        send_otp_email(email, otp)
+        stage('queue_mail')
+    else:
+        # Double click or client retry: the code already on its way stays valid
+        otp_email_limiter.refund(email)
+        otp_coalesced += 1
+
+    return jsonify({
+        'message': message,
+        'expires_in': OTP_TTL_SECONDS
+    }), 200
+
+
 @app.route('/api/auth/send-otp', methods=['POST'])
 def send_otp():
     """Send OTP to email for verification"""
@@ -689,24 +926,8 @@ def send_otp():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
-        # Generate OTP
-        otp = generate_otp()
-        expires_at = datetime.now() + timedelta(minutes=5)  # OTP expires in 5 minutes
-        
-        # Store OTP
-        otp_storage[email] = {
-            'otp': otp,
-            'expires_at': expires_at,
-            'attempts': 0
-        }
-        
-        # Send OTP (simulated)
-        send_otp_email(email, otp)
-        
-        return jsonify({
-            'message': 'OTP sent successfully',
-            'expires_in': 300  # 5 minutes in seconds
-        }), 200
+        # Generate, store and send OTP; it expires in 5 minutes
+        return issue_otp(email, 'OTP sent successfully')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -722,37 +943,24 @@ def verify_otp():
         if not email or not otp:
             return jsonify({'error': 'Email and OTP are required'}), 400
         
-        # Check if OTP exists
-        if email not in otp_storage:
+        # Check and consume the OTP in one step, so concurrent attempts can't race
+        outcome, attempts_remaining = otp_store.verify(email, otp, OTP_MAX_ATTEMPTS)
+        stage('store')
+        if outcome == MISSING:
             return jsonify({'error': 'OTP not found or expired'}), 400
-        
-        stored_data = otp_storage[email]
-        
-        # Check if OTP is expired
-        if datetime.now() > stored_data['expires_at']:
-            del otp_storage[email]
+        if outcome == EXPIRED:
             return jsonify({'error': 'OTP has expired'}), 400
-        
-        # Check attempts
-        if stored_data['attempts'] >= 3:
-            del otp_storage[email]
+        if outcome == LOCKED:
             return jsonify({'error': 'Too many attempts. Please request a new OTP'}), 400
-        
-        # Verify OTP
-        if stored_data['otp'] == otp:
-            # OTP is correct, remove it from storage
-            del otp_storage[email]
+        if outcome == VERIFIED:
             return jsonify({
                 'message': 'OTP verified successfully',
                 'verified': True
             }), 200
-        else:
-            # Increment attempts
-            stored_data['attempts'] += 1
-            return jsonify({
-                'error': 'Invalid OTP',
-                'attempts_remaining': 3 - stored_data['attempts']
-            }), 400
+        return jsonify({
+            'error': 'Invalid OTP',
+            'attempts_remaining': attempts_remaining
+        }), 400
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -767,24 +975,8 @@ def resend_otp():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
-        # Generate new OTP
-        otp = generate_otp()
-        expires_at = datetime.now() + timedelta(minutes=5)
-        
-        # Update OTP storage
-        otp_storage[email] = {
-            'otp': otp,
-            'expires_at': expires_at,
-            'attempts': 0
-        }
-        
-        # Send new OTP
-        send_otp_email(email, otp)
-        
-        return jsonify({
-            'message': 'OTP resent successfully',
-            'expires_in': 300
-        }), 200
+        # Generate new OTP, replacing the previous one
+        return issue_otp(email, 'OTP resent successfully')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
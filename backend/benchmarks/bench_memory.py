@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Memory footprint of the in-memory catalog.
+
+Compares the DataFrame that pd.read_csv produces with default dtypes
+(what the server used to hold per worker) against the retained size of
+the compact Catalog built from it, at a few replicated dataset sizes.
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from catalog import Catalog  # noqa: E402
+from synthetic import DATASET_PATH, replicate  # noqa: E402
+
+SIZES = [5_000, 50_000]
+
+
+def retained_bytes(build):
+    """Bytes still allocated after `build()` returns, and the object it built."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, obj
+
+
+def main():
+    base = pd.read_csv(DATASET_PATH)
+    for size in SIZES:
+        frame = replicate(base, size)
+        frame_bytes = int(frame.memory_usage(deep=True).sum())
+        catalog_bytes, catalog = retained_bytes(lambda: Catalog(frame))
+        listing_bytes = len(catalog.listing_json)
+        print(f"{size:>8} rows: DataFrame {frame_bytes / 2**20:7.2f} MiB | "
+              f"Catalog {catalog_bytes / 2**20:7.2f} MiB "
+              f"(of which prebuilt listing JSON {listing_bytes / 2**20:.2f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
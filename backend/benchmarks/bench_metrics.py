@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Overhead of per-stage request metrics.
+
+Times what metrics add to one request with four stages, keeping the
+fastest of ROUNDS runs: the StageTimer and queueing its readings for the
+histograms (folding included), which must stay under MAX_OVERHEAD_US, and
+separately the opt-in Server-Timing header. Then compares
+GET /api/internships/<id> through the Flask test client with metrics on
+and off, alternating rounds and keeping the fastest of each since the
+difference is within the noise.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+import app as server  # noqa: E402
+from metrics import Metrics, StageTimer, server_timing  # noqa: E402
+
+REPEAT = 100_000
+REQUESTS = 2_000
+ROUNDS = 5
+MAX_OVERHEAD_US = 5.0
+
+
+def instrumentation_cost(header: bool = False) -> float:
+    metrics = Metrics()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        timer = StageTimer()
+        timer.mark('parse')
+        timer.mark('cache')
+        timer.mark('score')
+        timer.mark('results')
+        metrics.record('recommend', 200, timer)
+        if header:
+            server_timing(timer)
+    metrics.flush()
+    return (time.perf_counter() - start) / REPEAT
+
+
+def request_cost(client, enabled: bool) -> float:
+    server.METRICS_ENABLED = enabled
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.get('/api/internships/3')
+    return (time.perf_counter() - start) / REQUESTS
+
+
+def main():
+    cost = min(instrumentation_cost() for _ in range(ROUNDS))
+    print(f"instrumentation: {cost * 1e6:.2f} us per request with 4 stages, "
+          f"{instrumentation_cost(header=True) * 1e6:.2f} us with the Server-Timing header")
+    client = server.app.test_client()
+    request_cost(client, True)
+    offs, ons = [], []
+    for _ in range(ROUNDS):
+        offs.append(request_cost(client, False))
+        ons.append(request_cost(client, True))
+    off, on = min(offs), min(ons)
+    print(f"GET /api/internships/<id>: {off * 1e6:.1f} us without metrics, {on * 1e6:.1f} us with ({(on - off) * 1e6:+.1f} us)")
+    if cost * 1e6 > MAX_OVERHEAD_US:
+        print(f"FAIL: metrics cost more than {MAX_OVERHEAD_US} us per request")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
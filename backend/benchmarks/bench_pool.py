@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Scaling of multi-process recommendation scoring.
+
+Times a batch of profiles split by user (ScoringPool.rank_many) and single
+profiles split by catalog rows (ScoringPool.rank_sharded) on a replicated
+catalog with 1, 2, 4 and 8 workers, against in-process Catalog.rank_many
+and Catalog.rank, and checks every pooled result matches the in-process one.
+
+Usage: python bench_pool.py [rows] [profiles]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from catalog import Catalog  # noqa: E402
+from scoring_pool import ScoringPool  # noqa: E402
+from synthetic import DATASET_PATH, random_profiles, replicate  # noqa: E402
+
+WORKERS = [1, 2, 4, 8]
+SINGLE_REPEAT = 20
+
+
+def same(a: list, b: list) -> bool:
+    return all(
+        np.array_equal(x[i][j], y[i][j])
+        for x, y in zip(a, b) for i in range(2) for j in range(2)
+    ) and len(a) == len(b)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    base = pd.read_csv(DATASET_PATH)
+    catalog = Catalog(replicate(base, rows))
+    users = random_profiles(base, count)
+    print(f"{rows} rows, {count} profiles, {os.cpu_count()} CPUs")
+
+    start = time.perf_counter()
+    expected = catalog.rank_many(users)
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user in users[:SINGLE_REPEAT]:
+        catalog.rank(user)
+    single_baseline = (time.perf_counter() - start) / SINGLE_REPEAT
+    print(f"in-process : {count / baseline:8.0f} profiles/s, single profile {single_baseline * 1e3:6.1f} ms")
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        for workers in WORKERS:
+            pool = ScoringPool(catalog, workers, snapshot_dir)
+            pool.rank_sharded(users[:1])  # start the workers before timing
+
+            start = time.perf_counter()
+            ranked = pool.rank_many(users)
+            batch = time.perf_counter() - start
+
+            start = time.perf_counter()
+            single = [pool.rank(user) for user in users[:SINGLE_REPEAT]]
+            latency = (time.perf_counter() - start) / SINGLE_REPEAT
+            pool.close()
+
+            ok = same(ranked, expected) and same(single, expected[:SINGLE_REPEAT])
+            print(f"{workers} workers  : {count / batch:8.0f} profiles/s "
+                  f"({baseline / batch:4.2f}x), row-sharded single profile {latency * 1e3:6.1f} ms"
+                  f"{'' if ok else '  MISMATCH'}")
+            if not ok:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Latency of BM25 keyword search (Catalog.search).
+
+Times a set of typical queries for the first page of 20 results on the
+dataset replicated to 5k and 500k rows (100x).
+
+Usage: python bench_search.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from catalog import Catalog  # noqa: E402
+from synthetic import DATASET_PATH, replicate  # noqa: E402
+
+SIZES = [5_000, 500_000]
+QUERIES = [
+    'python', 'data analysis', 'react developer remote', 'machine learning intern',
+    'java spring', 'marketing', 'cloud aws devops',
+]
+REPEAT = 20
+PAGE = 20
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or SIZES
+    base = pd.read_csv(DATASET_PATH)
+    for size in sizes:
+        start = time.perf_counter()
+        catalog = Catalog(replicate(base, size))
+        print(f"{size} rows (index built in {time.perf_counter() - start:.1f}s)")
+        timings = []
+        for query in QUERIES:
+            catalog.search(query, 0, PAGE)
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                total, _, _ = catalog.search(query, 0, PAGE)
+            timings.append((time.perf_counter() - start) / REPEAT)
+            print(f"  {query:<26} {total:>8} matches {timings[-1] * 1e3:8.3f} ms")
+        print(f"  mean {sum(timings) / len(timings) * 1e3:.3f} ms, max {max(timings) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
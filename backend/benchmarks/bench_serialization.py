@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for recommendation result serialization.
+
+Builds catalogs of increasing size by replicating pm_internships.csv and
+times how long it takes to turn the top 15 rows into response objects.
+The cost must not grow with the number of rows in the dataset. Each size
+keeps its fastest of several rounds, so one noisy round cannot fail the
+check.
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from catalog import Catalog  # noqa: E402
+from synthetic import DATASET_PATH, replicate  # noqa: E402
+
+SIZES = [5_000, 50_000, 200_000]
+RESULTS = 15
+REPEAT = 500
+ROUNDS = 5
+MAX_GROWTH = 2.0
+
+
+def time_serialization(catalog: Catalog) -> float:
+    rows = list(range(catalog.size - RESULTS, catalog.size))
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            [catalog.result(i, 0.5) for i in rows]
+        best = min(best, (time.perf_counter() - start) / REPEAT)
+    return best
+
+
+def main():
+    base = pd.read_csv(DATASET_PATH)
+    timings = {}
+    for size in SIZES:
+        timings[size] = time_serialization(Catalog(replicate(base, size)))
+        print(f"{size:>8} rows: {timings[size] * 1e6:8.1f} us per {RESULTS} results")
+
+    growth = timings[SIZES[-1]] / timings[SIZES[0]]
+    print(f"growth {SIZES[0]} -> {SIZES[-1]} rows: {growth:.2f}x")
+    if growth > MAX_GROWTH:
+        print(f"FAIL: serialization cost grew more than {MAX_GROWTH}x with dataset size")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Cost of the optional similarity ranking stage.
+
+Times Catalog.rank() for random profiles with the weighted score alone and
+with the TF-IDF similarity stage blended in, on pm_internships.csv (and any
+replicated sizes given), and reports what the stage adds per request.
+
+Usage: python bench_similarity.py [rows ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from catalog import Catalog  # noqa: E402
+from synthetic import DATASET_PATH, random_profiles, replicate  # noqa: E402
+
+PROFILES = 500
+BUDGET_MS = 1.0
+
+
+def timings(catalog: Catalog, users: list, similarity: bool) -> np.ndarray:
+    out = []
+    for user in users:
+        start = time.perf_counter()
+        catalog.rank(user, similarity=similarity)
+        out.append(time.perf_counter() - start)
+    return np.array(out) * 1e3
+
+
+def main():
+    base = pd.read_csv(DATASET_PATH)
+    sizes = [int(x) for x in sys.argv[1:]] or [len(base)]
+    users = random_profiles(base, PROFILES)
+    random.Random(3).shuffle(users)
+    for size in sizes:
+        catalog = Catalog(replicate(base, size))
+        timings(catalog, users[:20], True)
+        weighted = timings(catalog, users, False)
+        blended = timings(catalog, users, True)
+        added = blended - weighted
+        print(f"{size} rows: weighted p50 {np.median(weighted):.3f} ms, with similarity p50 {np.median(blended):.3f} ms, "
+              f"added p50 {np.median(added):.3f} ms / p95 {np.percentile(added, 95):.3f} ms")
+        if size == len(base) and np.median(added) > BUDGET_MS:
+            print(f"FAIL: similarity stage adds more than {BUDGET_MS} ms at the shipped catalog size")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
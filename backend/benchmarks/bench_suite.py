@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for the recommendation API.
+
+For each catalog size, generates a synthetic catalog (see synthetic.py),
+swaps it into the app and measures:
+
+  recommend_internships      scoring and result building for one profile
+  list_internships           GET /api/internships, a random page of 50
+  list_internships_filtered  GET /api/internships with location and skill filters
+  get_internship             GET /api/internships/<id>
+  extract_profile_from_text  term matching over a plain-text resume
+  upload_resume              POST /api/upload-resume with a new resume each time
+
+Each benchmark reports p50/p95/p99/mean/max latency in ms, throughput and
+the peak Python heap growth during one call (tracemalloc, measured on a
+separate pass so tracing does not skew the timings). The process peak RSS
+is recorded per size. Results are written as JSON; with --baseline, the
+p50 and p95 of a previous run are compared against this one.
+
+Usage: python bench_suite.py [--sizes 5k,50k,500k,1m] [--requests 200] [--seed 0]
+                             [--out results.json] [--baseline previous.json]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+import app as server  # noqa: E402
+from catalog import Catalog  # noqa: E402
+from synthetic import base_dataset, parse_size, random_profiles, resume_text, synthetic_catalog  # noqa: E402
+
+DEFAULT_SIZES = '5k,50k'
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+WARMUP = 5
+MEMORY_SAMPLES = 20
+PAGE_LIMIT = 50
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__) or '.',
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ''
+
+
+def measure(name: str, rows: int, call, count: int) -> dict:
+    """Time `call(i)` for i in range(count) after a warmup, then trace the heap on a few more calls"""
+    for i in range(WARMUP):
+        call(count + i)
+    latencies = np.empty(count)
+    started = time.perf_counter()
+    for i in range(count):
+        start = time.perf_counter()
+        call(i)
+        latencies[i] = time.perf_counter() - start
+    elapsed = time.perf_counter() - started
+
+    peak = 0
+    tracemalloc.start()
+    for i in range(min(count, MEMORY_SAMPLES)):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call(count + WARMUP + i)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    ms = latencies * 1e3
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'benchmark': name,
+        'rows': rows,
+        'requests': count,
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(ms.mean()), 4),
+        'max_ms': round(float(ms.max()), 4),
+        'throughput_per_s': round(count / elapsed, 1),
+        'peak_memory_bytes': int(peak),
+    }
+
+
+def checked(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def run_size(rows: int, base: pd.DataFrame, count: int, seed: int) -> tuple:
+    started = time.perf_counter()
+    frame = synthetic_catalog(rows, seed, base)
+    generated = time.perf_counter() - started
+    started = time.perf_counter()
+    catalog = Catalog(frame)
+    built = time.perf_counter() - started
+    del frame
+
+    # Every route reads the module-level catalog, so swapping it in is what a reload does
+    server.catalog = catalog
+    server.recommend_cache.clear()
+    client = server.app.test_client()
+
+    total = count + WARMUP + MEMORY_SAMPLES
+    rng = random.Random(seed)
+    profiles = random_profiles(base, total, seed)
+    resumes = [resume_text(profile, seed * total + i) for i, profile in enumerate(profiles)]
+    pages = max(1, -(-rows // PAGE_LIMIT))
+    ids = [rng.randint(1, rows) for _ in range(total)]  # synthetic ids are 1..rows
+    filters = [
+        {'location': profile['location'], 'skills': ','.join(profile['skills'][:2]), 'limit': PAGE_LIMIT}
+        for profile in profiles
+    ]
+
+    def upload(i):
+        data = {'file': (io.BytesIO(resumes[i].encode()), f'resume-{i}.txt')}
+        checked(client.post('/api/upload-resume', data=data, content_type='multipart/form-data'))
+
+    benchmarks = [
+        ('recommend_internships', lambda i: server.recommend_internships(profiles[i], catalog)),
+        ('list_internships', lambda i: checked(client.get(f'/api/internships?page={rng.randint(1, pages)}&limit={PAGE_LIMIT}'))),
+        ('list_internships_filtered', lambda i: checked(client.get('/api/internships', query_string=filters[i]))),
+        ('get_internship', lambda i: checked(client.get(f'/api/internships/{ids[i]}'))),
+        ('extract_profile_from_text', lambda i: server.extract_profile_from_text(resumes[i], catalog)),
+        ('upload_resume', upload),
+    ]
+    results = []
+    for name, call in benchmarks:
+        result = measure(name, rows, call, count)
+        results.append(result)
+        print(f"{rows:>8} rows  {name:<26} p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+              f"p99 {result['p99_ms']:9.3f} ms  {result['throughput_per_s']:9.1f}/s  "
+              f"peak {result['peak_memory_bytes'] / 2**10:8.1f} KiB")
+    dataset = {
+        'rows': rows,
+        'version': catalog.version,
+        'generate_seconds': round(generated, 3),
+        'build_seconds': round(built, 3),
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+    return dataset, results
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(r['rows'], r['benchmark']): r for r in json.load(f)['results']}
+    print(f"\nAgainst {baseline_path} (new / old):")
+    for result in results:
+        old = baseline.get((result['rows'], result['benchmark']))
+        if old is None:
+            continue
+        ratios = [result[k] / old[k] if old[k] else float('inf') for k in ('p50_ms', 'p95_ms')]
+        print(f"{result['rows']:>8} rows  {result['benchmark']:<26} p50 {ratios[0]:5.2f}x  p95 {ratios[1]:5.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated row counts, e.g. 5k,50k,500k,1m')
+    parser.add_argument('--requests', type=int, default=200, help='timed calls per benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='JSON output path (default: results/<timestamp>-<commit>.json)')
+    parser.add_argument('--baseline', help='earlier JSON output to compare against')
+    args = parser.parse_args()
+
+    sizes = [parse_size(x) for x in args.sizes.split(',') if x.strip()]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    commit = git_commit()
+    base = base_dataset()
+    datasets, results = [], []
+    for rows in sizes:
+        dataset, size_results = run_size(rows, base, args.requests, args.seed)
+        datasets.append(dataset)
+        results.extend(size_results)
+
+    report = {
+        'meta': {
+            'timestamp': now.isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'requests': args.requests,
+            'scoring_workers': server.SCORING_WORKERS,
+            'resume_workers': server.RESUME_WORKERS,
+        },
+        'datasets': datasets,
+        'results': results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{now.strftime('%Y%m%dT%H%M%S')}-{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {out}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
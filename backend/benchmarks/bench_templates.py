@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Render cost of the mail and confirmation templates.
+
+Times rendering each precompiled template with typical field values, and
+the full confirmation email path (render plus MIME envelope), per message.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app import EMAIL_CONFIG, submitted_at  # noqa: E402
+from html_templates import CONFIRMATION_DOCUMENT, CONFIRMATION_EMAIL, OTP_EMAIL  # noqa: E402
+from mailer import Mail, MailDispatcher  # noqa: E402
+
+REPEAT = 20_000
+MAILER = MailDispatcher(EMAIL_CONFIG)
+
+APPLICATION = {
+    'application_id': 'APP-1718000000-AB12CD',
+    'internship_title': 'Data Analyst Intern',
+    'company_name': 'Acme & Sons <Analytics>',
+    'applicant_name': 'Test Applicant',
+    'applicant_email': 'applicant@example.com',
+    'applicant_phone': '+91 98765 43210',
+}
+
+
+def per_call(fn) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT
+
+
+def confirmation_message():
+    html = CONFIRMATION_EMAIL.render(
+        application_id=APPLICATION['application_id'],
+        internship_title=APPLICATION['internship_title'],
+        company_name=APPLICATION['company_name'],
+        submitted=submitted_at(),
+    )
+    return MAILER._message(Mail(APPLICATION['applicant_email'], 'Application Confirmation', html))
+
+
+def main():
+    cases = {
+        'otp email': lambda: OTP_EMAIL.render(otp='123456'),
+        'confirmation email': lambda: CONFIRMATION_EMAIL.render(submitted=submitted_at(), **APPLICATION),
+        'confirmation document': lambda: CONFIRMATION_DOCUMENT.render(submitted=submitted_at(), **APPLICATION),
+        'confirmation email + MIME': confirmation_message,
+    }
+    for name, fn in cases.items():
+        print(f"{name:<26} {per_call(fn) * 1e6:8.1f} us per message")
+
+
+if __name__ == "__main__":
+    main()
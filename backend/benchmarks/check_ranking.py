@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Correctness check for recommendation ranking.
+
+On seeded random profiles (including ones with an empty education and an
+empty location), checks that the pruned Catalog.rank(), the dense
+Catalog.rank_many(), both over row shards merged with merge_ranked() (as
+the scoring pool runs them), and the original per-row scorer all return
+the same local and overall top-k lists, for pm_internships.csv and a
+synthetic catalog.
+
+The original scorer sorted stably in dataset order; the catalog breaks
+ties on internship_id, which is the same order here since both datasets
+have ascending ids.
+
+Usage: python check_ranking.py [profiles] [synthetic rows] [seed]
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from catalog import Catalog, preprocess_sets  # noqa: E402
+from synthetic import base_dataset, random_profiles, synthetic_catalog  # noqa: E402
+
+TOP_K = [(5, 10), (1, 1), (0, 3), (5, 50)]
+SHARDS = 3
+TOLERANCE = 1e-9
+
+
+def score_internship(internship: dict, user: dict):
+    """The scorer ranking used before the columnar catalog, one row at a time"""
+    loc_match = 1 if str(internship.get('location', '')).strip().lower() == str(user.get('location', '')).strip().lower() else 0
+
+    intern_sectors = preprocess_sets(internship.get('category', ''))
+    user_sectors = set([x.strip().lower() for x in user.get('sectors', [])])
+    sector_match_norm = len(user_sectors & intern_sectors) / len(intern_sectors) if intern_sectors else 0
+
+    intern_skills = preprocess_sets(internship.get('skills', ''))
+    user_skills = set([x.strip().lower() for x in user.get('skills', [])])
+    skill_match_norm = len(user_skills & intern_skills) / len(intern_skills) if intern_skills else 0
+
+    edu_req = str(internship.get('education', '')).strip().lower()
+    edu_match = 1 if str(user.get('education', '')).strip().lower() in edu_req else 0
+
+    score = (0.45 * loc_match) + (0.35 * sector_match_norm) + (0.15 * skill_match_norm) + (0.05 * edu_match)
+    return score, loc_match
+
+
+def baseline_scores(records: list, user: dict) -> list:
+    scores = []
+    for internship in records:
+        score, loc_match = score_internship(internship, user)
+        scores.append((int(internship['internship_id']), float(score), loc_match))
+    return scores
+
+
+def baseline_rank(scores: list, top_k_local: int, top_k_overall: int):
+    local = [s for s in scores if s[2] == 1]
+    local_sorted = sorted(local, key=lambda x: x[1], reverse=True)[:top_k_local]
+    overall_sorted = sorted(scores, key=lambda x: x[1], reverse=True)[:top_k_overall]
+    return [(i, s) for i, s, _ in local_sorted], [(i, s) for i, s, _ in overall_sorted]
+
+
+def as_ids(catalog: Catalog, ranked) -> tuple:
+    return tuple([(int(catalog.ids[row]), float(score)) for row, score in zip(*lists)] for lists in ranked)
+
+
+def same(a: list, b: list) -> bool:
+    return len(a) == len(b) and all(x[0] == y[0] and abs(x[1] - y[1]) <= TOLERANCE for x, y in zip(a, b))
+
+
+def check(name: str, frame: pd.DataFrame, profiles: list) -> int:
+    ids = pd.to_numeric(frame['internship_id'])
+    if not ids.is_monotonic_increasing:
+        raise SystemExit(f"{name}: internship ids must ascend for the tie order to match")
+    catalog = Catalog(frame)
+    records = frame.to_dict('records')
+    bounds = [catalog.size * i // SHARDS for i in range(SHARDS + 1)]
+    expected_scores = [baseline_scores(records, user) for user in profiles]
+    failures = 0
+    for k_local, k_overall in TOP_K:
+        dense = catalog.rank_many(profiles, k_local, k_overall)
+        sharded = catalog.merge_ranked(
+            [catalog.rank_many(profiles, k_local, k_overall, lo, hi) for lo, hi in zip(bounds, bounds[1:])],
+            k_local, k_overall,
+        )
+        for i, user in enumerate(profiles):
+            expected = baseline_rank(expected_scores[i], k_local, k_overall)
+            shards = [[catalog.rank(user, k_local, k_overall, start=lo, stop=hi)] for lo, hi in zip(bounds, bounds[1:])]
+            candidates = {
+                'rank': as_ids(catalog, catalog.rank(user, k_local, k_overall)),
+                'rank sharded': as_ids(catalog, catalog.merge_ranked(shards, k_local, k_overall)[0]),
+                'rank_many': as_ids(catalog, dense[i]),
+                'rank_many sharded': as_ids(catalog, sharded[i]),
+            }
+            for method, got in candidates.items():
+                if not (same(got[0], expected[0]) and same(got[1], expected[1])):
+                    failures += 1
+                    if failures <= 5:
+                        print(f"MISMATCH {name} {method} top_k=({k_local}, {k_overall}) profile {user}:\n"
+                              f"  got      {got}\n  expected {expected}")
+    print(f"{name}: {catalog.size} rows, {len(profiles)} profiles x {len(TOP_K)} top-k settings, {failures} mismatches")
+    return failures
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    base = base_dataset()
+    profiles = random_profiles(base, count, seed)
+    # Empty fields match in their own way: '' is a substring of every education requirement
+    profiles += [dict(p, education='') for p in profiles[:count // 4]]
+    profiles += [dict(p, location='') for p in profiles[:count // 4]]
+    profiles += [{'location': '', 'skills': [], 'sectors': [], 'education': ''}, {}]
+
+    failures = check('pm_internships.csv', base, profiles)
+    failures += check('synthetic', synthetic_catalog(rows, seed, base), profiles)
+    if failures:
+        print("FAIL: ranking paths disagree")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
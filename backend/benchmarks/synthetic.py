@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Synthetic data shaped like pm_internships.csv, shared by the benchmarks.
+
+synthetic_catalog() draws any number of rows from the column distributions
+of the real dataset: categorical columns keep their observed frequencies,
+skill lists keep their observed lengths and follow the skill mix of the
+row's title (hardware titles get hardware skills), and descriptions are
+recombined from the real role prefixes and sentences. Unlike replicate(),
+which repeats the CSV, every row is drawn independently, so filters, ties
+and search postings behave like a larger real dataset. Everything is
+seeded and reproducible.
+
+Usage: python synthetic.py rows [out.csv] [seed]
+"""
+
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'pm_internships.csv')
+SIZES = {'5k': 5_000, '50k': 50_000, '500k': 500_000, '1m': 1_000_000}
+# Share of each row's skill weights taken from the whole dataset rather than its title
+SKILL_SMOOTHING = 0.1
+CHUNK = 20_000
+
+# Degree spellings as users type them, alongside the dataset's own values
+PROFILE_EDUCATION = ['B.Tech', 'b. tech', 'BCA', 'MBA', 'M.Tech', 'BSc', 'MCA', 'Bachelor', '']
+RESUME_SECTIONS = [
+    'Built dashboards tracking weekly active users and retention for the product team.',
+    'Interviewed customers and turned the findings into a prioritised feature backlog.',
+    'Wrote product requirement documents and worked with engineers through delivery.',
+    'Ran A/B tests on the onboarding flow and presented the results to leadership.',
+    'Coordinated a team of five volunteers organising the college technical festival.',
+]
+
+
+def base_dataset(path: str = DATASET_PATH) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+
+def replicate(frame: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """`rows` rows made of repeated copies of `frame`, with fresh ids"""
+    copies = -(-rows // len(frame))
+    big = pd.concat([frame] * copies, ignore_index=True).iloc[:rows].copy()
+    big['internship_id'] = range(1, rows + 1)
+    return big
+
+
+def parse_size(value: str) -> int:
+    """'50k', '1m' or a plain row count"""
+    value = value.strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value.replace('_', ''))
+
+
+def skill_lists(frame: pd.DataFrame) -> pd.Series:
+    return frame['skills'].fillna('').map(lambda v: [s.strip() for s in str(v).split(',') if s.strip()])
+
+
+def _frequencies(values: pd.Series):
+    counts = values.value_counts()
+    return counts.index.to_numpy(dtype=object), (counts / counts.sum()).to_numpy()
+
+
+def _sample_skills(rng: np.random.Generator, weights: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Per row, lengths[i] distinct skill indices drawn by weight (Gumbel top-k)"""
+    keys = np.log(weights) + rng.gumbel(size=(len(lengths), len(weights)))
+    width = int(lengths.max())
+    top = np.argpartition(-keys, width - 1, axis=1)[:, :width]
+    # Order each row's picks by key so truncating to its length keeps the heaviest draws
+    order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def synthetic_catalog(rows: int, seed: int = 0, base: pd.DataFrame = None) -> pd.DataFrame:
+    """`rows` internships drawn from the distributions of `base` (pm_internships.csv by default)"""
+    base = base_dataset() if base is None else base
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({'internship_id': np.arange(1, rows + 1)})
+
+    for column in ('title', 'company', 'location', 'category', 'duration', 'education'):
+        values, p = _frequencies(base[column].dropna())
+        frame[column] = values[rng.choice(len(values), size=rows, p=p)]
+
+    low, high = int(base['stipend'].min()), int(base['stipend'].max())
+    frame['stipend'] = rng.integers(low, high + 1, size=rows)
+
+    # Descriptions are "<role>: <sentence>"; roles and sentences are recombined independently
+    parts = base['description'].dropna().str.split(': ', n=1, expand=True).dropna()
+    roles, role_p = _frequencies(parts[0])
+    sentences, sentence_p = _frequencies(parts[1])
+    frame['description'] = (
+        pd.Series(roles[rng.choice(len(roles), size=rows, p=role_p)]) + ': '
+        + pd.Series(sentences[rng.choice(len(sentences), size=rows, p=sentence_p)])
+    ).to_numpy(dtype=object)
+
+    # Skill lists: observed lengths, skills weighted by how often they appear under the row's title
+    lists = skill_lists(base)
+    vocabulary = sorted({s for skills in lists for s in skills})
+    index = {s: i for i, s in enumerate(vocabulary)}
+    overall = np.zeros(len(vocabulary))
+    by_title = {}
+    for title, skills in zip(base['title'], lists):
+        counts = by_title.setdefault(title, np.zeros(len(vocabulary)))
+        for s in skills:
+            counts[index[s]] += 1
+            overall[index[s]] += 1
+    overall /= overall.sum()
+    length_values, length_p = _frequencies(lists.map(len))
+    lengths = np.minimum(length_values[rng.choice(len(length_values), size=rows, p=length_p)].astype(np.int64), len(vocabulary))
+
+    names = np.array(vocabulary, dtype=object)
+    skills = np.empty(rows, dtype=object)
+    titles = frame['title'].to_numpy()
+    for title in np.unique(titles):
+        counts = by_title.get(title, overall)
+        weights = (1 - SKILL_SMOOTHING) * counts / counts.sum() + SKILL_SMOOTHING * overall
+        members = np.flatnonzero(titles == title)
+        for start in range(0, len(members), CHUNK):
+            chunk = members[start:start + CHUNK]
+            picks = _sample_skills(rng, weights, lengths[chunk])
+            skills[chunk] = [', '.join(names[row[:n]]) for row, n in zip(picks, lengths[chunk])]
+    frame['skills'] = skills
+    return frame[list(base.columns)]
+
+
+def random_profiles(frame: pd.DataFrame, count: int, seed: int = 7) -> list:
+    """Profiles like the frontend sends: common skills more likely, some unknown locations and degrees"""
+    rng = random.Random(seed)
+    locations = list(frame['location'].dropna().unique()) + ['Remote', 'Surat']
+    categories = list(frame['category'].dropna().unique())
+    counts = skill_lists(frame).explode().value_counts()
+    skills, weights = list(counts.index), list(counts.to_numpy())
+    education = list(frame['education'].dropna().unique()) + PROFILE_EDUCATION
+    profiles = []
+    for _ in range(count):
+        chosen = []
+        wanted = rng.randint(1, 6)
+        while len(chosen) < wanted:
+            skill = rng.choices(skills, weights)[0]
+            if skill not in chosen:
+                chosen.append(skill)
+        profiles.append({
+            'location': rng.choice(locations),
+            'skills': chosen,
+            'sectors': rng.sample(categories, rng.randint(0, 2)),
+            'education': rng.choice(education),
+        })
+    return profiles
+
+
+def resume_text(profile: dict, seed: int = 0) -> str:
+    """Plain-text resume mentioning the profile's skills, location and degree amid ordinary prose"""
+    rng = random.Random(seed)
+    years = rng.randint(0, 4)
+    lines = [
+        f"Candidate {seed}",
+        f"Based in {profile['location']} | candidate{seed}@example.com | +91 98765 {seed % 100000:05d}",
+        '',
+        'SUMMARY',
+        f"Aspiring product manager with {years} years of experience across internships and projects.",
+        '',
+        'EDUCATION',
+        f"{profile['education'] or 'Bachelor'} in Computer Science, 2021 - 2025, CGPA 8.{rng.randint(0, 9)}",
+        '',
+        'EXPERIENCE',
+    ]
+    lines += rng.sample(RESUME_SECTIONS, 3)
+    lines += ['', 'SKILLS', ', '.join(profile['skills'])]
+    if profile['sectors']:
+        lines += ['', 'INTERESTS', ', '.join(profile['sectors'])]
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    rows = parse_size(sys.argv[1])
+    out = sys.argv[2] if len(sys.argv) > 2 else f'pm_internships_{rows}.csv'
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    synthetic_catalog(rows, seed).to_csv(out, index=False)
+    print(f"Wrote {rows} rows to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Compile the internship CSV into a binary catalog snapshot.
+
+The server memory-maps the snapshot at startup instead of parsing the CSV,
+so workers boot quickly and share the catalog pages. Re-run this after
+publishing a new CSV; a snapshot older than its CSV is ignored.
+
+Usage: python build_snapshot.py [csv_path] [snapshot_path]
+"""
+
+import os
+import sys
+import time
+
+from catalog import Catalog
+from app import DATASET_PATH, SNAPSHOT_PATH, load_dataset
+
+
+def build_snapshot(csv_path: str, snapshot_path: str):
+    start = time.perf_counter()
+    catalog = Catalog(load_dataset(csv_path))
+    catalog.save_snapshot(snapshot_path)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Wrote {snapshot_path}: {catalog.size} internships, version {catalog.version}, "
+          f"{os.path.getsize(snapshot_path) / 2**20:.2f} MiB in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_PATH
+    build_snapshot(csv_path, snapshot_path)
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction and hit counters."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class ResumeCache:
+    """Parsed resume profiles by content hash: an in-memory LRU, optionally backed by JSON files.
+
+    Only the extracted profile is kept, never the uploaded file. Each entry
+    remembers how long its parse took, so hits can report the time saved.
+    """
+
+    def __init__(self, maxsize: int = 512, directory: str = '', max_files: int = 10000):
+        self.memory = LRUCache(maxsize)
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.seconds_saved = 0.0
+        self._writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key: str):
+        entry = self.memory.get(key)
+        if entry is None and self.directory:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                self.memory.put(key, entry)
+                with self._lock:
+                    self.disk_hits += 1
+        if entry is None:
+            return None
+        with self._lock:
+            self.seconds_saved += entry['seconds']
+        return entry['profile']
+
+    def put(self, key: str, profile: dict, seconds: float):
+        entry = {'profile': profile, 'seconds': seconds}
+        self.memory.put(key, entry)
+        if not self.directory:
+            return
+        path = self._path(key)
+        partial = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(partial, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(partial, path)
+        except OSError:
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        """Drop the least recently written files beyond max_files"""
+        try:
+            with os.scandir(self.directory) as entries:
+                files = [(e.stat().st_mtime, e.path) for e in entries if e.name.endswith('.json')]
+        except OSError:
+            return
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        lookups = memory['hits'] + memory['misses']
+        with self._lock:
+            hits = memory['hits'] + self.disk_hits
+            return {
+                **memory,
+                'hits': hits,
+                'misses': memory['misses'] - self.disk_hits,
+                'disk_hits': self.disk_hits,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'parse_seconds_saved': round(self.seconds_saved, 3),
+                'disk': bool(self.directory),
+            }
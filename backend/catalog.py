@@ -0,0 +1,852 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+# Priority weights for the recommendation score
+LOCATION_WEIGHT = 0.45
+SECTOR_WEIGHT = 0.35
+SKILL_WEIGHT = 0.15
+EDUCATION_WEIGHT = 0.05
+
+# Snapshot file layout: magic, uint64 header length, JSON header, then
+# 64-byte aligned raw arrays at the offsets listed in the header
+SNAPSHOT_MAGIC = b'PMCATv2\0'
+SNAPSHOT_ALIGN = 64
+
+# Full-text search: BM25 parameters; title words count this many times toward term frequency
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_BOOST = 2
+# Query terms below this BM25 idf (in about 90% of rows or more) are ignored unless every term is
+MIN_SEARCH_IDF = 0.1
+_WORD = re.compile(r'[a-z0-9]+(?:[+#]+|(?:\.[a-z0-9]+)+)?')
+_WORD_PART = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from in into is it of on or our the this to we will with you your'.split()
+)
+
+# Optional similarity stage: share of the final score given to TF-IDF skill/sector cosine similarity
+SIMILARITY_WEIGHT = 0.25
+
+# Upper bound on matrix cells (users x rows, tokens x rows) materialized per batch step
+BATCH_CELLS = 4_000_000
+
+
+def preprocess_sets(s):
+    if pd.notna(s) and isinstance(s, str):
+        return set(x.strip().lower() for x in s.split(','))
+    return set()
+
+
+def normalize_value(value) -> str:
+    return str(value).strip().lower()
+
+
+def _text(value, default: str = '') -> str:
+    return str(value) if pd.notna(value) else default
+
+
+class StringColumn:
+    """Dictionary-encoded text column: each distinct string is stored once, rows hold int32 codes."""
+
+    def __init__(self, values):
+        lookup = {}
+        self.codes = np.fromiter(
+            (lookup.setdefault(v, len(lookup)) for v in values),
+            dtype=np.int32,
+            count=len(values),
+        )
+        self.values = list(lookup)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+
+def _encode_categorical(values):
+    """Map each value to an integer code; returns (codes, normalized value -> code)."""
+    lookup = {}
+    codes = np.fromiter(
+        (lookup.setdefault(normalize_value(v), len(lookup)) for v in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, lookup
+
+
+def _encode_token_lists(token_lists, vocab: dict):
+    """Flatten per-row token lists into a token-id buffer plus row offsets."""
+    tokens = []
+    offsets = [0]
+    for row_tokens in token_lists:
+        tokens.extend(vocab.setdefault(t, len(vocab)) for t in row_tokens)
+        offsets.append(len(tokens))
+    return np.asarray(tokens, dtype=np.int32), np.asarray(offsets, dtype=np.int64)
+
+
+def _encode_token_sets(values, vocab: dict):
+    """Tokenize comma-separated cells like preprocess_sets into a flat token-id buffer plus row offsets."""
+    return _encode_token_lists((sorted(preprocess_sets(v)) for v in values), vocab)
+
+
+def _display_skills(value) -> list:
+    return [x.strip() for x in str(value).split(',') if x.strip()] if pd.notna(value) else []
+
+
+def _run_lengths(rows: np.ndarray):
+    """Distinct values of `rows` (ascending) and how often each occurs."""
+    rows = np.sort(rows)
+    if not len(rows):
+        return rows, rows
+    starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    return rows[starts], np.diff(np.append(starts, len(rows)))
+
+
+def _value_rows(column: 'StringColumn', index: 'Postings', value: str) -> np.ndarray:
+    """Ascending rows whose `column` value equals `value`, ignoring case and padding."""
+    key = normalize_value(value)
+    codes = [code for code, v in enumerate(column.values) if normalize_value(v) == key]
+    return np.sort(index.gather(codes))
+
+
+def _top_counts(counts: np.ndarray, names: list, limit: int) -> dict:
+    present = np.flatnonzero(counts)
+    present = present[np.lexsort((present, -counts[present]))][:limit]
+    return {names[code]: int(counts[code]) for code in present}
+
+
+def search_tokens(text: str) -> list:
+    """Lowercased words for the search index; "node.js" and "c++" also yield their parts"""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        tokens.append(word)
+        parts = _WORD_PART.findall(word)
+        if parts != [word]:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+def term_features(term: str) -> set:
+    """Similarity features of a skill or sector name: its words and word parts, plus the
+    acronym of a multi-word name, so "Node.js" meets "node" and "Machine Learning" meets "ML"."""
+    features = set(search_tokens(term))
+    words = _WORD_PART.findall(term.lower())
+    if len(words) > 1 and all(len(w) > 2 for w in words):
+        features.add(''.join(w[0] for w in words))
+    return features
+
+
+def _value_counts(column: 'StringColumn', rows: np.ndarray, limit: int) -> dict:
+    return _top_counts(np.bincount(column.codes[rows], minlength=len(column.values)), column.values, limit)
+
+
+class Postings:
+    """Inverted index in CSR form: token t occurs in rows[indptr[t]:indptr[t + 1]], ascending."""
+
+    def __init__(self, tokens: np.ndarray, token_rows: np.ndarray, n_tokens: int):
+        order = np.argsort(tokens, kind='stable')
+        self.rows = token_rows[order]
+        self.indptr = np.zeros(n_tokens + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tokens, minlength=n_tokens), out=self.indptr[1:])
+
+    def get(self, token: int, start: int = 0, stop: int = None) -> np.ndarray:
+        rows = self.rows[self.indptr[token]:self.indptr[token + 1]]
+        if start or stop is not None:
+            rows = rows[np.searchsorted(rows, start):len(rows) if stop is None else np.searchsorted(rows, stop)]
+        return rows
+
+    def gather(self, tokens, start: int = 0, stop: int = None) -> np.ndarray:
+        """Concatenated posting lists of `tokens` within rows [start, stop); a row appears once per token it holds."""
+        if not len(tokens):
+            return self.rows[:0]
+        return np.concatenate([self.get(t, start, stop) for t in tokens])
+
+
+class Catalog:
+    """Columnar view of the internship dataset, tokenized once at load.
+
+    Location and education are stored as integer codes, category and skills
+    as per-row token sets (flat token ids + offsets) sharing one vocabulary,
+    so a user can be scored against every row with a handful of array ops.
+    Each of these fields also has an inverted index so recommendations only
+    need to score rows sharing at least one term with the user.
+
+    The source DataFrame is not kept: display text is dictionary-encoded,
+    numbers are typed arrays, and response cards are rebuilt from them.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.reset_index(drop=True)
+        self.size = len(frame)
+        # Content hash; anything cached against a catalog is keyed on it
+        self.version = hashlib.sha1(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()).hexdigest()[:12]
+
+        self.location_codes, self.locations = _encode_categorical(frame['location'].tolist())
+        self.education_codes, self.educations = _encode_categorical(frame['education'].tolist())
+
+        self.vocab = {}
+        self.category_tokens, self.category_offsets = _encode_token_sets(frame['category'].tolist(), self.vocab)
+        self.skill_tokens, self.skill_offsets = _encode_token_sets(frame['skills'].tolist(), self.vocab)
+
+        # Display columns for response cards
+        ids = pd.to_numeric(frame['internship_id'], errors='coerce').to_numpy(dtype=float)
+        self.id_valid = ~np.isnan(ids)
+        self.ids = np.where(self.id_valid, ids, 0).astype(np.int64)
+        self.titles = StringColumn([_text(v) for v in frame['title'].tolist()])
+        self.companies = StringColumn([_text(v, 'Company') for v in frame['company'].tolist()])
+        self.descriptions = StringColumn([_text(v) for v in frame['description'].tolist()])
+        self.location_names = StringColumn([_text(v) for v in frame['location'].tolist()])
+        self.category_names = StringColumn([
+            (str(v).split(',')[0].strip() if pd.notna(v) else '') or 'Technology' for v in frame['category'].tolist()
+        ])
+        self.durations = StringColumn([_text(v, '3 months') for v in frame['duration'].tolist()])
+        self.education_names = StringColumn([_text(v) for v in frame['education'].tolist()])
+        self.stipends = np.fromiter(
+            (int(v) if pd.notna(v) and str(v).strip() != '' else 0 for v in frame['stipend'].tolist()),
+            dtype=np.int32,
+            count=self.size,
+        )
+        self.skill_names = {}
+        self.display_skill_tokens, self.display_skill_offsets = _encode_token_lists(
+            (_display_skills(v) for v in frame['skills'].tolist()), self.skill_names
+        )
+        self.skill_names = list(self.skill_names)
+
+        # BM25 index over title, company, skills and description, one weight per posting
+        self.search_terms = {}
+        self.search_index, self.search_weights = self._build_search_index(
+            StringColumn([_text(v) for v in frame['skills'].tolist()])
+        )
+
+        # Position of each row in internship_id order, used to break score ties
+        self.rows_by_id = np.argsort(ids, kind='stable').astype(np.int32)
+        self.id_rank = np.empty(self.size, dtype=np.int32)
+        self.id_rank[self.rows_by_id] = np.arange(self.size, dtype=np.int32)
+        self.sorted_ids = self.ids[self.rows_by_id[:int(self.id_valid.sum())]]
+
+        rows = np.arange(self.size, dtype=np.int32)
+        self.category_lengths = np.diff(self.category_offsets).astype(np.int32)
+        self.skill_lengths = np.diff(self.skill_offsets).astype(np.int32)
+        self.category_token_rows = np.repeat(rows, self.category_lengths)
+        self.skill_token_rows = np.repeat(rows, self.skill_lengths)
+
+        self.location_index = Postings(self.location_codes, rows, len(self.locations))
+        self.education_index = Postings(self.education_codes, rows, len(self.educations))
+        self.category_index = Postings(self.category_tokens, self.category_token_rows, len(self.vocab))
+        self.skill_index = Postings(self.skill_tokens, self.skill_token_rows, len(self.vocab))
+
+        # TF-IDF vectors of each row's skills and sectors, stored column-wise for sparse dot products
+        self.similarity_terms = {}
+        self.similarity_index, self.similarity_weights, self.similarity_idf = self._build_similarity_index()
+
+        # Listing filters and facets work on the displayed values
+        self.category_name_index = Postings(self.category_names.codes, rows, len(self.category_names.values))
+        self.duration_index = Postings(self.durations.codes, rows, len(self.durations.values))
+        self.display_skill_token_rows = np.repeat(rows, np.diff(self.display_skill_offsets).astype(np.int32))
+        self.rows_by_stipend = np.argsort(self.stipends, kind='stable').astype(np.int32)
+        self.sorted_stipends = self.stipends[self.rows_by_stipend]
+
+        # The whole listing is encoded once as a JSON array; any page is a slice of it
+        fragments = [json.dumps(self.card(row), separators=(',', ':'), sort_keys=True).encode() for row in range(self.size)]
+        lengths = np.fromiter((len(f) for f in fragments), dtype=np.int64, count=self.size)
+        self.listing_json = np.frombuffer(b'[' + b','.join(fragments) + b']', dtype=np.uint8)
+        self.listing_starts = 1 + np.concatenate(([0], np.cumsum(lengths + 1)[:-1])).astype(np.int64)
+        self.listing_ends = self.listing_starts + lengths
+
+    def _build_search_index(self, skills: StringColumn):
+        """Postings of every search term plus the precomputed BM25 weight of each (term, row) pair."""
+        terms = self.search_terms
+
+        def encode(column: StringColumn) -> list:
+            # Each distinct string is tokenized once
+            return [Counter(terms.setdefault(t, len(terms)) for t in search_tokens(v)) for v in column.values]
+
+        fields = [
+            (encode(self.titles), self.titles.codes, TITLE_BOOST),
+            (encode(self.companies), self.companies.codes, 1),
+            (encode(skills), skills.codes, 1),
+            (encode(self.descriptions), self.descriptions.codes, 1),
+        ]
+        term_ids, tfs, per_row = [], [], np.zeros(self.size, dtype=np.int64)
+        for row in range(self.size):
+            counts = Counter()
+            for encoded, codes, boost in fields:
+                for term, n in encoded[codes[row]].items():
+                    counts[term] += n * boost
+            term_ids.extend(counts)
+            tfs.extend(counts.values())
+            per_row[row] = len(counts)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        tf = np.asarray(tfs, dtype=np.float64)
+        rows = np.repeat(np.arange(self.size, dtype=np.int32), per_row)
+
+        lengths = np.bincount(rows, weights=tf, minlength=self.size)
+        average = lengths.mean() if self.size else 0.0
+        df = np.bincount(term_ids, minlength=len(terms))
+        idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / max(average, 1e-9))
+        weights = (idf[term_ids] * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+
+        # Sorted by (term, row), so the postings built below keep the weights aligned
+        order = np.lexsort((rows, term_ids))
+        return Postings(term_ids[order], rows[order], len(terms)), weights[order]
+
+    def _build_similarity_index(self):
+        """Sparse row x feature TF-IDF matrix (L2-normalized rows) as feature postings."""
+        features = self.similarity_terms
+        # Features of each vocabulary token, as a CSR token -> feature matrix
+        token_features = [sorted(features.setdefault(f, len(features)) for f in term_features(t)) for t in self.vocab]
+        feature_ids = np.asarray([f for fs in token_features for f in fs], dtype=np.int64)
+        feature_offsets = np.concatenate(([0], np.cumsum([len(fs) for fs in token_features]))).astype(np.int64)
+
+        # (row, token) pairs from skills and sectors, expanded to (row, feature) and summed into tf
+        tokens = np.concatenate([self.skill_tokens, self.category_tokens])
+        token_rows = np.concatenate([self.skill_token_rows, self.category_token_rows]).astype(np.int64)
+        counts = np.diff(feature_offsets)[tokens]
+        starts = np.repeat(feature_offsets[tokens] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        pair_features = feature_ids[starts + np.arange(counts.sum())]
+        keys, tf = _run_lengths(np.repeat(token_rows, counts) * max(len(features), 1) + pair_features)
+        rows = (keys // max(len(features), 1)).astype(np.int32)
+        columns = (keys % max(len(features), 1)).astype(np.int32)
+
+        df = np.bincount(columns, minlength=len(features))
+        idf = np.log((1 + self.size) / (1 + df)) + 1
+        weights = tf * idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=self.size))
+        weights = (weights / norms[rows]).astype(np.float32)
+
+        order = np.lexsort((rows, columns))
+        return Postings(columns[order], rows[order], len(features)), weights[order], idf.astype(np.float32)
+
+    def save_snapshot(self, path: str):
+        """Write the catalog as a binary snapshot that load_snapshot can memory-map."""
+        header = {'arrays': {}, 'meta': {}}
+        arrays = []
+        offset = 0
+        for name, value in vars(self).items():
+            if isinstance(value, StringColumn):
+                header['meta'][name + '.values'] = value.values
+                value, name = value.codes, name + '.codes'
+            elif isinstance(value, Postings):
+                header['arrays'][name + '.indptr'] = None
+                arrays.append((name + '.indptr', value.indptr))
+                value, name = value.rows, name + '.rows'
+            elif not isinstance(value, np.ndarray):
+                header['meta'][name] = value
+                continue
+            header['arrays'][name] = None
+            arrays.append((name, value))
+
+        for name, array in arrays:
+            array = np.ascontiguousarray(array)
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+        header_bytes = json.dumps(header).encode()
+        data_start = -(-(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for name, array in arrays:
+                f.seek(data_start + header['arrays'][name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> 'Catalog':
+        """Open a snapshot written by save_snapshot; arrays are read-only views of a shared mmap."""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot')
+        header_start = len(SNAPSHOT_MAGIC) + 8
+        header_len = int.from_bytes(buffer[len(SNAPSHOT_MAGIC):header_start], 'little')
+        header = json.loads(buffer[header_start:header_start + header_len])
+        data_start = -(-(header_start + header_len) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+        fields = dict(header['meta'])
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec['offset'])
+            fields[name] = array.reshape(spec['shape'])
+
+        catalog = cls.__new__(cls)
+        for name, value in fields.items():
+            attr, _, part = name.partition('.')
+            if part in ('codes', 'values'):
+                column = getattr(catalog, attr, None) or StringColumn.__new__(StringColumn)
+                setattr(column, part, value)
+                value = column
+            elif part in ('rows', 'indptr'):
+                index = getattr(catalog, attr, None) or Postings.__new__(Postings)
+                setattr(index, part, value)
+                value = index
+            setattr(catalog, attr, value)
+        return catalog
+
+    @property
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def listing_page(self, start: int, stop: int) -> bytes:
+        """JSON array of the cards for rows [start, stop)."""
+        start, stop = max(start, 0), min(stop, self.size)
+        if start >= stop:
+            return b'[]'
+        if start == 0 and stop == self.size:
+            return self.listing_json.tobytes()
+        return b'[' + self.listing_json[self.listing_starts[start]:self.listing_ends[stop - 1]].tobytes() + b']'
+
+    def card_json(self, row: int) -> bytes:
+        return self.listing_json[self.listing_starts[row]:self.listing_ends[row]].tobytes()
+
+    def find(self, internship_id) -> int:
+        """Row of `internship_id` (first occurrence), or -1 when it is not in the catalog."""
+        key = str(internship_id)
+        try:
+            value = int(key)
+        except ValueError:
+            return -1
+        if str(value) != key:
+            return -1
+        pos = int(np.searchsorted(self.sorted_ids, value))
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == value:
+            return int(self.rows_by_id[pos])
+        return -1
+
+    def search(self, query: str, start: int = 0, stop: int = 10):
+        """BM25 matches for `query`: (total matches, rows ranked [start, stop), their scores)."""
+        terms = sorted({self.search_terms[t] for t in search_tokens(query) if t in self.search_terms})
+        empty = np.zeros(0, dtype=np.int32)
+        if not terms:
+            return 0, empty, empty.astype(np.float64)
+        indptr = self.search_index.indptr
+        # Near-universal terms ("intern") add almost nothing to any score but would match every row
+        df = indptr[np.add(terms, 1)] - indptr[terms]
+        selective = np.log1p((self.size - df + 0.5) / (df + 0.5)) >= MIN_SEARCH_IDF
+        if selective.any():
+            terms = [t for t, keep in zip(terms, selective) if keep]
+        postings = [(self.search_index.rows[indptr[t]:indptr[t + 1]], self.search_weights[indptr[t]:indptr[t + 1]]) for t in terms]
+        matched = sum(len(rows) for rows, _ in postings)
+        if len(terms) == 1:
+            rows, scores = postings[0]
+            total = len(rows)
+        elif matched * 64 < self.size:
+            # Few postings: sum per row after a small sort instead of touching every row
+            rows = np.concatenate([rows for rows, _ in postings])
+            weights = np.concatenate([weights for _, weights in postings]).astype(np.float64)
+            order = np.argsort(rows, kind='stable')
+            rows, weights = rows[order], weights[order]
+            starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+            rows, scores = rows[starts], np.add.reduceat(weights, starts)
+            total = len(rows)
+        else:
+            # Dense: accumulate one score per catalog row, then keep the matched ones
+            totals = np.zeros(self.size, dtype=np.float64)
+            for rows, weights in postings:
+                totals += np.bincount(rows, weights=weights, minlength=self.size)
+            rows = np.flatnonzero(totals).astype(np.int32)
+            scores = totals[rows]
+            total = len(rows)
+        stop = min(stop, total)
+        ranked_rows, ranked_scores = self.top_k(rows, scores, stop)
+        return total, ranked_rows[start:stop], ranked_scores[start:stop].astype(np.float64)
+
+    def filter(self, location=None, category=None, skills=(), education=None, duration=None,
+               min_stipend=None, max_stipend=None) -> np.ndarray:
+        """Ascending rows matching every given filter (case-insensitive; any of `skills`)."""
+        postings = []
+        if location:
+            code = self.locations.get(normalize_value(location), -1)
+            postings.append(self.location_index.get(code) if code >= 0 else self.location_index.rows[:0])
+        if education:
+            code = self.educations.get(normalize_value(education), -1)
+            postings.append(self.education_index.get(code) if code >= 0 else self.education_index.rows[:0])
+        if category:
+            postings.append(_value_rows(self.category_names, self.category_name_index, category))
+        if duration:
+            postings.append(_value_rows(self.durations, self.duration_index, duration))
+        if skills:
+            ids = [self.vocab[s] for s in set(normalize_value(s) for s in skills) if s in self.vocab]
+            postings.append(_run_lengths(self.skill_index.gather(ids))[0])
+        if min_stipend is not None or max_stipend is not None:
+            lo = np.searchsorted(self.sorted_stipends, min_stipend, side='left') if min_stipend is not None else 0
+            hi = np.searchsorted(self.sorted_stipends, max_stipend, side='right') if max_stipend is not None else self.size
+            postings.append(np.sort(self.rows_by_stipend[lo:hi]))
+
+        if not postings:
+            return np.arange(self.size, dtype=np.int32)
+        # Intersect smallest-first so every step works on the shortest list
+        postings.sort(key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def facets(self, rows: np.ndarray, limit: int = 50) -> dict:
+        """Value counts among `rows` for each filterable field, most frequent first."""
+        selected = np.zeros(self.size, dtype=bool)
+        selected[rows] = True
+        skill_counts = np.bincount(
+            self.display_skill_tokens[selected[self.display_skill_token_rows]], minlength=len(self.skill_names)
+        )
+        stipends = self.stipends[rows]
+        return {
+            'location': _value_counts(self.location_names, rows, limit),
+            'category': _value_counts(self.category_names, rows, limit),
+            'education': _value_counts(self.education_names, rows, limit),
+            'duration': _value_counts(self.durations, rows, limit),
+            'skills': _top_counts(skill_counts, self.skill_names, limit),
+            'stipend': {
+                'min': int(stipends.min()) if len(rows) else None,
+                'max': int(stipends.max()) if len(rows) else None,
+            },
+        }
+
+    def cards_json(self, rows) -> bytes:
+        """JSON array of the cards for `rows`, in the given order."""
+        return b'[' + b','.join(self.card_json(row) for row in rows) + b']'
+
+    def card(self, row: int) -> dict:
+        """Response object for one row, as returned by the listing endpoints."""
+        skills = self.display_skill_tokens[self.display_skill_offsets[row]:self.display_skill_offsets[row + 1]]
+        return {
+            'id': int(self.ids[row]) if self.id_valid[row] else None,
+            'title': self.titles[row],
+            'location': self.location_names[row],
+            'matchScore': None,
+            'skills': [self.skill_names[t] for t in skills],
+            'description': self.descriptions[row],
+            'category': self.category_names[row],
+            'company': self.companies[row],
+            'stipend': int(self.stipends[row]),
+            'duration': self.durations[row],
+        }
+
+    def results_json(self, rows, scores) -> bytes:
+        """JSON array of result objects, spliced from the prebuilt cards."""
+        return b'[' + b','.join(
+            self.card_json(row).replace(b'"matchScore":null', b'"matchScore":%d' % int(round(score * 100)), 1)
+            for row, score in zip(rows, scores)
+        ) + b']'
+
+    def result(self, row: int, score: float) -> dict:
+        """Response object for `row` with its match score filled in."""
+        card = self.card(row)
+        card['matchScore'] = int(round(score * 100))
+        return card
+
+    def top_k(self, rows: np.ndarray, scores: np.ndarray, k: int):
+        """The `k` best (row, score) pairs among `rows`, ties broken by internship_id."""
+        if k <= 0 or len(rows) == 0:
+            return rows[:0], scores[:0]
+        if len(rows) > k:
+            # Partition instead of a full sort; keep every row tied with the k-th score
+            kth = np.partition(scores, len(rows) - k)[len(rows) - k]
+            keep = scores >= kth
+            rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((self.id_rank[rows], -scores))[:k]
+        return rows[order], scores[order]
+
+    def _user_terms(self, user: dict):
+        """Normalize a user profile to (location code, sector ids, skill ids, education codes)."""
+        user_location = normalize_value(user.get('location', ''))
+        location = self.locations.get(user_location, -1)
+
+        user_sectors = set([x.strip().lower() for x in user.get('sectors', [])])
+        sectors = [self.vocab[v] for v in user_sectors if v in self.vocab]
+
+        user_skills = set([x.strip().lower() for x in user.get('skills', [])])
+        skills = [self.vocab[v] for v in user_skills if v in self.vocab]
+
+        # Education requirements matched by substring, evaluated once per distinct value
+        user_education = normalize_value(user.get('education', ''))
+        educations = [code for e, code in self.educations.items() if user_education in e]
+        return location, sectors, skills, educations
+
+    def score(self, user: dict):
+        """Weighted score of every row for `user`; returns (scores, loc_match) arrays."""
+        scores, loc_match = self.score_matrix([user])
+        return scores[0], loc_match[0]
+
+    def score_matrix(self, users: list, start: int = 0, stop: int = None):
+        """Score a batch of users against rows [start, stop); returns (users x rows) scores and loc_match."""
+        stop = self.size if stop is None else stop
+        terms = [self._user_terms(user) for user in users]
+        locations = np.array([t[0] for t in terms], dtype=np.int64)
+        loc_match = self.location_codes[None, start:stop] == locations[:, None]
+
+        sector_mask = np.zeros((len(users), len(self.vocab)), dtype=bool)
+        skill_mask = np.zeros((len(users), len(self.vocab)), dtype=bool)
+        edu_table = np.zeros((len(users), len(self.educations)), dtype=bool)
+        for i, (_, sectors, skills, educations) in enumerate(terms):
+            sector_mask[i, sectors] = True
+            skill_mask[i, skills] = True
+            edu_table[i, educations] = True
+
+        sector_counts = self._token_counts(sector_mask, self.category_tokens, self.category_offsets, start, stop)
+        skill_counts = self._token_counts(skill_mask, self.skill_tokens, self.skill_offsets, start, stop)
+        category_lengths = self.category_lengths[start:stop]
+        skill_lengths = self.skill_lengths[start:stop]
+        scores = self._combine(
+            loc_match,
+            np.divide(sector_counts, category_lengths, out=np.zeros(sector_counts.shape), where=category_lengths > 0),
+            np.divide(skill_counts, skill_lengths, out=np.zeros(skill_counts.shape), where=skill_lengths > 0),
+            edu_table[:, self.education_codes[start:stop]],
+        )
+        return scores, loc_match
+
+    def _token_counts(self, masks: np.ndarray, tokens: np.ndarray, offsets: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """(users x rows in [start, stop)) number of each row's tokens set in `masks` (users x vocab).
+
+        Computed as a dense matrix product against a row-token incidence matrix
+        restricted to the tokens these users hold, built in memory-bounded row
+        slices; counts are small integers, so float32 is exact.
+        """
+        counts = np.zeros((len(masks), stop - start), dtype=np.float32)
+        used = np.flatnonzero(masks.any(axis=0))
+        if not len(used):
+            return counts
+        column = np.full(len(self.vocab), -1, dtype=np.int64)
+        column[used] = np.arange(len(used))
+        user_masks = masks[:, used].astype(np.float32)
+
+        step = max(1, BATCH_CELLS // len(used))
+        for lo in range(start, stop, step):
+            hi = min(lo + step, stop)
+            token_columns = column[tokens[offsets[lo]:offsets[hi]]]
+            token_rows = np.repeat(np.arange(hi - lo), np.diff(offsets[lo:hi + 1]))
+            keep = token_columns >= 0
+            incidence = np.zeros((len(used), hi - lo), dtype=np.float32)
+            incidence[token_columns[keep], token_rows[keep]] = 1
+            counts[:, lo - start:hi - start] = user_masks @ incidence
+        return counts
+
+    def rank_many(self, users: list, top_k_local: int = 5, top_k_overall: int = 10,
+                  start: int = 0, stop: int = None) -> list:
+        """rank() for many users, scored as user x row matrices in memory-bounded chunks.
+
+        With [start, stop) only that row range is considered, so shards of the
+        catalog can be ranked separately and merged with merge_ranked().
+        """
+        stop = self.size if stop is None else stop
+        chunk = max(1, BATCH_CELLS // max(stop - start, 1))
+        shard_rows = np.arange(start, stop, dtype=np.int32)
+        ranked = []
+        for first in range(0, len(users), chunk):
+            scores, loc_match = self.score_matrix(users[first:first + chunk], start, stop)
+            for user_scores, user_loc in zip(scores, loc_match):
+                ranked.append((
+                    self.top_k(shard_rows[user_loc], user_scores[user_loc], top_k_local),
+                    self.top_k(shard_rows, user_scores, top_k_overall),
+                ))
+        return ranked
+
+    def merge_ranked(self, shards: list, top_k_local: int = 5, top_k_overall: int = 10) -> list:
+        """Combine per-shard rank_many() results for the same users into global top-k lists."""
+        merged = []
+        for per_user in zip(*shards):
+            lists = []
+            for which, k in ((0, top_k_local), (1, top_k_overall)):
+                rows = np.concatenate([r[which][0] for r in per_user])
+                scores = np.concatenate([r[which][1] for r in per_user])
+                lists.append(self.top_k(rows, scores, k))
+            merged.append(tuple(lists))
+        return merged
+
+    def similarity(self, user: dict):
+        """Cosine similarity of the user's skills and sectors to every row: (ascending rows, similarities).
+
+        One sparse matrix-vector product: the user's TF-IDF vector times the
+        catalog matrix, accumulated from the postings of the user's features.
+        """
+        counts = Counter()
+        names = {x.strip().lower() for x in list(user.get('skills', [])) + list(user.get('sectors', []))}
+        for name in names:
+            counts.update(f for f in term_features(name) if f in self.similarity_terms)
+        if not counts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0)
+        columns = np.fromiter((self.similarity_terms[f] for f in counts), dtype=np.int64, count=len(counts))
+        vector = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.similarity_idf[columns]
+        vector /= np.sqrt((vector ** 2).sum())
+
+        indptr = self.similarity_index.indptr
+        rows = np.concatenate([self.similarity_index.rows[indptr[c]:indptr[c + 1]] for c in columns])
+        products = np.concatenate([
+            self.similarity_weights[indptr[c]:indptr[c + 1]] * value for c, value in zip(columns, vector)
+        ])
+        if len(rows) * 64 >= self.size:
+            totals = np.bincount(rows, weights=products, minlength=self.size)
+            rows = np.flatnonzero(totals).astype(np.int32)
+            return rows, np.minimum(totals[rows], 1.0)
+        order = np.argsort(rows, kind='stable')
+        rows, products = rows[order], products[order]
+        starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+        return rows[starts], np.minimum(np.add.reduceat(products, starts), 1.0)
+
+    def _blend_similarity(self, user: dict, rows, scores, loc_match, educations, start: int = 0, stop: int = None):
+        """Candidates widened to every similar row in [start, stop), scored (1 - w) * weighted + w * similarity."""
+        similar_rows, similarities = self.similarity(user)
+        if start or stop is not None:
+            keep = slice(np.searchsorted(similar_rows, start), None if stop is None else np.searchsorted(similar_rows, stop))
+            similar_rows, similarities = similar_rows[keep], similarities[keep]
+        merged, _ = _run_lengths(np.concatenate([rows, similar_rows]))
+        base = EDUCATION_WEIGHT * np.isin(self.education_codes[merged], educations)
+        base[np.searchsorted(merged, rows)] = scores
+        blended_loc = np.zeros(len(merged), dtype=bool)
+        blended_loc[np.searchsorted(merged, rows)] = loc_match
+        similarity = np.zeros(len(merged))
+        similarity[np.searchsorted(merged, similar_rows)] = similarities
+        return merged, (1 - SIMILARITY_WEIGHT) * base + SIMILARITY_WEIGHT * similarity, blended_loc
+
+    @staticmethod
+    def _combine(loc_match, sector_match_norm, skill_match_norm, edu_match):
+        return (
+            LOCATION_WEIGHT * loc_match
+            + SECTOR_WEIGHT * sector_match_norm
+            + SKILL_WEIGHT * skill_match_norm
+            + EDUCATION_WEIGHT * edu_match
+        )
+
+    def score_candidates(self, user: dict, start: int = 0, stop: int = None):
+        """Score only rows in [start, stop) sharing a location, sector or skill with `user`.
+
+        Returns (rows, scores, loc_match, educations); rows are ascending.
+        Every other row can only score EDUCATION_WEIGHT or 0.
+        """
+        location, sectors, skills, educations = self._user_terms(user)
+        loc_rows = self.location_index.get(location, start, stop) if location >= 0 else self.location_index.rows[:0]
+        sector_rows, sector_counts = _run_lengths(self.category_index.gather(sectors, start, stop))
+        skill_rows, skill_counts = _run_lengths(self.skill_index.gather(skills, start, stop))
+
+        rows, _ = _run_lengths(np.concatenate([loc_rows, sector_rows, skill_rows]))
+        loc_match = np.zeros(len(rows), dtype=bool)
+        loc_match[np.searchsorted(rows, loc_rows)] = True
+        sector_match_norm = np.zeros(len(rows))
+        sector_match_norm[np.searchsorted(rows, sector_rows)] = sector_counts / self.category_lengths[sector_rows]
+        skill_match_norm = np.zeros(len(rows))
+        skill_match_norm[np.searchsorted(rows, skill_rows)] = skill_counts / self.skill_lengths[skill_rows]
+        edu_match = np.isin(self.education_codes[rows], educations)
+
+        scores = self._combine(loc_match, sector_match_norm, skill_match_norm, edu_match)
+        return rows, scores, loc_match, educations
+
+    def _row_matches(self, rows: np.ndarray, wanted: list, tokens: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """How many of each row's tokens (tokens[offsets[row]:offsets[row + 1]]) are in `wanted`."""
+        lengths = offsets[rows + 1] - offsets[rows]
+        owners = np.repeat(np.arange(len(rows)), lengths)
+        positions = np.arange(len(owners)) + np.repeat(offsets[rows] - (np.cumsum(lengths) - lengths), lengths)
+        mask = np.zeros(len(self.vocab), dtype=bool)
+        mask[wanted] = True
+        return np.bincount(owners[mask[tokens[positions]]], minlength=len(rows))
+
+    def _rank_bounded(self, user: dict, top_k_local: int, top_k_overall: int, start: int = 0, stop: int = None):
+        """rank() from the rows in [start, stop) matching the user's location and a sector of theirs, if they settle it.
+
+        When the user has both, those rows come from the sector postings alone;
+        any other row scores at most LOCATION_WEIGHT + SKILL_WEIGHT +
+        EDUCATION_WEIGHT, and at most SKILL_WEIGHT + EDUCATION_WEIGHT when they
+        have only one. Once the k-th best candidate is above that, the remaining
+        location, sector and skill postings are never walked. Returns None when
+        other rows could still place.
+        """
+        location, sectors, skills, educations = self._user_terms(user)
+        if sectors:
+            rows, sector_counts = _run_lengths(self.category_index.gather(sectors, start, stop))
+            sector_match_norm = sector_counts / self.category_lengths[rows]
+            if location >= 0:
+                here = self.location_codes[rows] == location
+                rows, sector_match_norm = rows[here], sector_match_norm[here]
+        elif location >= 0:
+            rows = self.location_index.get(location, start, stop)
+            sector_match_norm = np.zeros(len(rows))
+        else:
+            return None
+        skill_counts = self._row_matches(rows, skills, self.skill_tokens, self.skill_offsets)
+        skill_lengths = self.skill_lengths[rows]
+        scores = self._combine(
+            np.full(len(rows), location >= 0),
+            sector_match_norm,
+            np.divide(skill_counts, skill_lengths, out=np.zeros(len(rows)), where=skill_lengths > 0),
+            np.isin(self.education_codes[rows], educations),
+        )
+        # Scored the same way as a row, so each bound is exactly the best a missing row can reach
+        if sectors and location >= 0:
+            bound = max(self._combine(True, 0.0, 1.0, True), self._combine(False, 1.0, 1.0, True))
+        else:
+            bound = self._combine(False, 0.0, 1.0, True)
+
+        # Without a location the local list is empty
+        local = top_k_local if location >= 0 else 0
+        k = max(local, top_k_overall)
+        top_rows, top_scores = self.top_k(rows, scores, k)
+        if k > 0 and (len(top_rows) < k or top_scores[-1] <= bound):
+            return None
+        return (top_rows[:local], top_scores[:local]), (top_rows[:top_k_overall], top_scores[:top_k_overall])
+
+    def _education_fill(self, educations, exclude: np.ndarray, k: int, start: int = 0, stop: int = None):
+        """Best `k` rows in [start, stop) outside `exclude` (sorted) when only education can still match."""
+        matched = np.setdiff1d(np.sort(self.education_index.gather(educations, start, stop)), exclude, assume_unique=True)
+        if len(matched) > k:
+            matched = matched[np.argpartition(self.id_rank[matched], k - 1)[:k]]
+        rows = [matched]
+        scores = [np.full(len(matched), EDUCATION_WEIGHT)]
+        if len(matched) < k:
+            # Zero-score rows in id order; at most len(skip) of the first ids are skipped
+            skip = np.union1d(exclude, matched)
+            by_id = self.rows_by_id
+            if start or stop is not None:
+                by_id = by_id[(by_id >= start) & (by_id < (self.size if stop is None else stop))]
+            head = by_id[:k + len(skip)]
+            zero_rows = head[~np.isin(head, skip)][:k - len(matched)]
+            rows.append(zero_rows)
+            scores.append(np.zeros(len(zero_rows)))
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def rank(self, user: dict, top_k_local: int = 5, top_k_overall: int = 10, similarity: bool = False,
+             start: int = 0, stop: int = None):
+        """Top (rows, scores) for `user`: among rows in their location, and overall.
+
+        With `similarity`, the weighted score is blended with skill/sector
+        TF-IDF similarity (see _blend_similarity). With [start, stop) only that
+        row range is ranked, so shards can be merged with merge_ranked().
+        Without `similarity`, the rows matching both the user's location and a sector are
+        ranked first, and the rest are scored only when they could still place
+        (see _rank_bounded).
+        """
+        if not similarity:
+            ranked = self._rank_bounded(user, top_k_local, top_k_overall, start, stop)
+            if ranked is not None:
+                return ranked
+        rows, scores, loc_match, educations = self.score_candidates(user, start, stop)
+        scale = 1.0
+        if similarity:
+            rows, scores, loc_match = self._blend_similarity(user, rows, scores, loc_match, educations, start, stop)
+            scale = 1 - SIMILARITY_WEIGHT
+        local = self.top_k(rows[loc_match], scores[loc_match], top_k_local)
+        overall = self.top_k(rows, scores, top_k_overall)
+
+        # Rows outside the candidates score at most EDUCATION_WEIGHT; merge them in
+        # only when they could reach the overall list
+        fill_bound = scale * EDUCATION_WEIGHT if educations else 0.0
+        size = (self.size if stop is None else stop) - start
+        if len(overall[0]) < min(top_k_overall, size) or (len(overall[1]) and overall[1][-1] <= fill_bound):
+            fill_rows, fill_scores = self._education_fill(educations, rows, top_k_overall, start, stop)
+            overall = self.top_k(
+                np.concatenate([overall[0], fill_rows]),
+                np.concatenate([overall[1], scale * fill_scores]),
+                top_k_overall,
+            )
+        return local, overall
@@ -0,0 +1,40 @@
+"""
+HTML for outgoing mail and the confirmation download.
+
+Templates live in templates/ and use {{ name }} slots. Each file is split
+once, at import, into its static text and slot names; rendering only
+escapes the values and joins the pieces.
+"""
+
+import html
+import os
+import re
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+SLOT = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class SlotTemplate:
+    def __init__(self, source: str):
+        parts = SLOT.split(source)
+        self.static = parts[0::2]
+        self.slots = parts[1::2]
+
+    @classmethod
+    def load(cls, name: str) -> 'SlotTemplate':
+        with open(os.path.join(TEMPLATE_DIR, name), encoding='utf-8') as f:
+            return cls(f.read())
+
+    def render(self, **values) -> str:
+        """Fill every slot with its HTML-escaped value; a missing value raises KeyError"""
+        escaped = {name: html.escape(str(values[name])) for name in set(self.slots)}
+        out = [self.static[0]]
+        for name, text in zip(self.slots, self.static[1:]):
+            out.append(escaped[name])
+            out.append(text)
+        return ''.join(out)
+
+
+OTP_EMAIL = SlotTemplate.load('otp_email.html')
+CONFIRMATION_EMAIL = SlotTemplate.load('confirmation_email.html')
+CONFIRMATION_DOCUMENT = SlotTemplate.load('confirmation_document.html')
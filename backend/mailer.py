@@ -0,0 +1,233 @@
+"""
+Background SMTP dispatcher for OTP and confirmation mail.
+
+Requests enqueue a message and return at once. Worker threads each keep
+one authenticated SMTP connection open and reuse it for every message,
+draining whatever has queued up in one go during bursts. Failed sends are
+retried with exponential backoff on a fresh connection; a connection
+left idle is closed before the server drops it.
+"""
+
+import base64
+import heapq
+import itertools
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from email.header import Header
+from email.utils import formataddr
+
+
+def _header(value: str) -> str:
+    """One-line header value; RFC 2047 encoded when it is not plain ASCII"""
+    value = ' '.join(str(value).split())
+    return value if value.isascii() else Header(value, 'utf-8').encode()
+
+
+class Mail:
+    def __init__(self, to: str, subject: str, html: str, on_failure=None):
+        self.to = to
+        self.subject = subject
+        self.html = html
+        self.on_failure = on_failure
+        self.attempts = 0
+
+
+class MailDispatcher:
+    """Queue of outbound mail served by `workers` threads with one persistent connection each.
+
+    `config` uses the EMAIL_CONFIG keys (smtp_server, smtp_port, sender_email,
+    sender_password, sender_name) plus optional use_tls (STARTTLS, default
+    True), use_ssl (implicit TLS) and login (default True), so a plain local
+    SMTP server can stand in for the real one. `observe(stage, seconds)`, when
+    given, is called with the time of each connect (handshake, TLS and login)
+    and each successful send.
+    """
+
+    def __init__(self, config: dict, workers: int = 1, max_batch: int = 50, max_attempts: int = 4,
+                 backoff: float = 1.0, idle_timeout: float = 30.0, queue_size: int = 10000, timeout: float = 10.0,
+                 observe=None):
+        self.config = config
+        self.observe = observe
+        self._envelope = (
+            'Content-Type: text/html; charset="utf-8"\nMIME-Version: 1.0\nContent-Transfer-Encoding: base64\n'
+            f"From: {formataddr((config['sender_name'], config['sender_email']))}\n"
+        )
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._retries = []
+        self._sequence = itertools.count()
+        self._threads = []
+        self._stopping = threading.Event()
+        self._pending = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.connections = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'mail-{n}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def send(self, to: str, subject: str, html: str, on_failure=None) -> bool:
+        """Queue a message; False when the queue is full. `on_failure(mail)` runs if it is finally dropped."""
+        self.start()
+        with self._lock:
+            self._pending += 1
+        try:
+            self.queue.put_nowait(Mail(to, subject, html, on_failure))
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            return False
+        return True
+
+    def depth(self) -> int:
+        """Messages queued, waiting to be retried or being sent"""
+        with self._lock:
+            return self._pending
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every queued message has been sent or dropped"""
+        deadline = time.monotonic() + timeout
+        while self.depth():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        self.flush(timeout)
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queued': self._pending,
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'batches': self.batches,
+                'connections': self.connections,
+            }
+
+    def _connect(self) -> smtplib.SMTP:
+        config = self.config
+        started = time.perf_counter()
+        if config.get('use_ssl'):
+            server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'], timeout=self.timeout,
+                                      context=ssl.create_default_context())
+        else:
+            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'], timeout=self.timeout)
+            if config.get('use_tls', True):
+                server.starttls(context=ssl.create_default_context())
+        if config.get('login', True):
+            server.login(config['sender_email'], config['sender_password'])
+        with self._lock:
+            self.connections += 1
+        if self.observe is not None:
+            self.observe('connect', time.perf_counter() - started)
+        return server
+
+    def _message(self, mail: Mail) -> str:
+        """Single-part text/html message: the fixed headers are built once, only To/Subject/body per mail"""
+        body = base64.encodebytes(mail.html.encode('utf-8')).decode('ascii')
+        return f"{self._envelope}To: {_header(mail.to)}\nSubject: {_header(mail.subject)}\n\n{body}"
+
+    def _next_batch(self) -> list:
+        """Due retries plus whatever is queued, waiting for the first message up to idle_timeout"""
+        with self._lock:
+            now = time.monotonic()
+            batch = []
+            while self._retries and self._retries[0][0] <= now and len(batch) < self.max_batch:
+                batch.append(heapq.heappop(self._retries)[2])
+            wait = self._retries[0][0] - now if self._retries else self.idle_timeout
+        if not batch:
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, min(wait, self.idle_timeout))))
+            except queue.Empty:
+                return batch
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _retry_or_drop(self, mail: Mail, error: Exception):
+        mail.attempts += 1
+        if mail.attempts >= self.max_attempts:
+            print(f"Failed to send email to {mail.to}: {error}")
+            with self._lock:
+                self.failed += 1
+                self._pending -= 1
+            if mail.on_failure is not None:
+                mail.on_failure(mail)
+            return
+        with self._lock:
+            self.retried += 1
+            heapq.heappush(self._retries, (time.monotonic() + self.backoff * 2 ** (mail.attempts - 1), next(self._sequence), mail))
+
+    def _run(self):
+        server = None
+        last_used = time.monotonic()
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if server is not None and time.monotonic() - last_used > self.idle_timeout:
+                server = self._close(server)
+            if not batch:
+                continue
+            with self._lock:
+                self.batches += 1
+            for index, mail in enumerate(batch):
+                if server is None:
+                    try:
+                        server = self._connect()
+                    except Exception as e:
+                        # Server unreachable: back off the rest of the batch instead of reconnecting per message
+                        for waiting in batch[index:]:
+                            self._retry_or_drop(waiting, e)
+                        break
+                try:
+                    started = time.perf_counter()
+                    server.sendmail(self.config['sender_email'], mail.to, self._message(mail))
+                    if self.observe is not None:
+                        self.observe('send', time.perf_counter() - started)
+                    with self._lock:
+                        self.sent += 1
+                        self._pending -= 1
+                except smtplib.SMTPRecipientsRefused as e:
+                    mail.attempts = self.max_attempts
+                    self._retry_or_drop(mail, e)
+                except Exception as e:
+                    # The connection may be dead; the next message reconnects
+                    server = self._close(server)
+                    self._retry_or_drop(mail, e)
+            last_used = time.monotonic()
+        self._close(server)
+
+    @staticmethod
+    def _close(server):
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return None
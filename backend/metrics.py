@@ -0,0 +1,183 @@
+"""
+Request latency metrics, exposed in the Prometheus text format.
+
+Each request carries a StageTimer; routes call mark() as each stage ends
+(parse, score, ...), and when the response goes out Metrics.record()
+queues the timer's raw perf_counter() readings under the request's series
+(endpoint, status and sequence of stages). Queued readings are turned into
+durations and folded into fixed-bucket histograms (labelled by endpoint
+and stage) with numpy, a whole series at a time once it holds FLUSH_EVERY
+requests and on each scrape, so the request itself only pays for a few
+perf_counter() reads and list appends.
+
+server_timing() formats a timer as a Server-Timing header value. Formatting
+the floats costs more than everything else together, so the app sends the
+header only when asked to.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from itertools import chain
+
+import numpy as np
+
+# Upper bounds in seconds, from 100 us to 10 s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_BUCKETS_MS = np.array(BUCKETS) * 1e3
+FLUSH_EVERY = 1024
+
+
+class Histogram:
+    """Bucket counts and sum of observations, in milliseconds"""
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKETS) + 1, dtype=np.int64)
+        self.total = 0.0
+
+    def observe_many(self, ms: np.ndarray):
+        # searchsorted 'left' puts a value equal to a bound in that bound's bucket (Prometheus "le")
+        self.counts += np.bincount(np.searchsorted(_BUCKETS_MS, ms), minlength=len(self.counts))
+        self.total += float(ms.sum())
+
+
+# The StageTimer of the request being handled, if it is timed
+current_timer = ContextVar('current_timer', default=None)
+
+
+class StageTimer:
+    """Times consecutive stages of one request: mark(name) ends the stage begun at the previous mark"""
+
+    __slots__ = ('stages', 'times')
+
+    def __init__(self):
+        self.stages = []
+        self.times = [time.perf_counter()]
+
+    def mark(self, stage: str):
+        self.stages.append(stage)
+        self.times.append(time.perf_counter())
+
+
+def stage(name: str):
+    """End the named stage of the current request's timer (a no-op when nothing is being timed)"""
+    timer = current_timer.get()
+    if timer is not None:
+        timer.mark(name)
+
+
+_formats = {}  # stages -> Server-Timing format
+
+
+def server_timing(timer: StageTimer) -> str:
+    """Server-Timing header value of a timer that Metrics.record() has finished"""
+    stages = tuple(timer.stages)
+    fmt = _formats.get(stages)
+    if fmt is None:
+        fmt = _formats.setdefault(stages, ', '.join(f'{name};dur=%.3f' for name in stages + ('total',)))
+    times = timer.times
+    # With no stages marked, times holds just the start and the end
+    ms = [(b - a) * 1e3 for a, b in zip(times, times[1:])] if stages else []
+    ms.append((times[-1] - times[0]) * 1e3)
+    return fmt % tuple(ms)
+
+
+def _labels(**labels) -> str:
+    return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                    for k, v in labels.items())
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (endpoint, stage) -> Histogram
+        self._series = {}      # (endpoint, status, *stages) -> queued StageTimer.times lists
+        self._statuses = {}    # (endpoint, status) -> count
+        self._smtp = {}        # stage -> Histogram
+
+    def record(self, endpoint: str, status: int, timer: StageTimer, trailing: str = 'respond'):
+        """Queue a finished request for the histograms.
+
+        Time since the last mark counts as `trailing` when any stage was marked.
+        The timer must not be marked again afterwards: its readings are queued as they are.
+        """
+        times = timer.times
+        times.append(time.perf_counter())
+        stages = timer.stages
+        if stages:
+            stages.append(trailing)
+        key = (endpoint, status, *stages)
+        queued = self._series.get(key)
+        if queued is None:
+            queued = self._series.setdefault(key, [])
+        queued.append(times)
+        if len(queued) >= FLUSH_EVERY:
+            self._fold(key, queued)
+
+    def _fold(self, key: tuple, queued: list):
+        with self._lock:
+            # Requests finishing meanwhile append past `count` and stay queued for the next fold
+            count = len(queued)
+            if not count:
+                return
+            endpoint, status, *stages = key
+            width = len(queued[0])
+            times = np.fromiter(chain.from_iterable(queued[:count]), float, count * width).reshape(count, width)
+            del queued[:count]
+            ms = np.diff(times, axis=1) * 1e3
+            columns = [(stage, ms[:, column]) for column, stage in enumerate(stages)]
+            columns.append(('total', (times[:, -1] - times[:, 0]) * 1e3))
+            for stage, values in columns:
+                histogram = self._histograms.get((endpoint, stage))
+                if histogram is None:
+                    histogram = self._histograms[endpoint, stage] = Histogram()
+                histogram.observe_many(values)
+            self._statuses[endpoint, status] = self._statuses.get((endpoint, status), 0) + count
+
+    def flush(self):
+        """Fold every queued request into the histograms"""
+        for key, queued in list(self._series.items()):
+            self._fold(key, queued)
+
+    def observe_smtp(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._smtp.get(stage)
+            if histogram is None:
+                histogram = self._smtp[stage] = Histogram()
+            histogram.observe_many(np.array([seconds * 1e3]))
+
+    def render(self, gauges=()) -> str:
+        """Prometheus text exposition; `gauges` adds (name, help, type, [(labels dict, value)]) families"""
+        self.flush()
+        with self._lock:
+            requests = sorted((key, list(h.counts), h.total) for key, h in self._histograms.items())
+            statuses = sorted(self._statuses.items())
+            smtp = sorted((stage, list(h.counts), h.total) for stage, h in self._smtp.items())
+
+        lines = []
+        self._histogram_lines(lines, 'pm_request_duration_seconds',
+                              'Request latency by endpoint and stage; stage "total" is the whole request',
+                              [(_labels(endpoint=e, stage=s), counts, total) for (e, s), counts, total in requests])
+        lines += ['# HELP pm_requests_total Responses by endpoint and status code', '# TYPE pm_requests_total counter']
+        lines += [f'pm_requests_total{{{_labels(endpoint=e, status=s)}}} {n}' for (e, s), n in statuses]
+        self._histogram_lines(lines, 'pm_smtp_duration_seconds',
+                              'SMTP time per stage: connect (handshake, TLS, login) and send (one message)',
+                              [(_labels(stage=s), counts, total) for s, counts, total in smtp])
+        for name, help_text, kind, samples in gauges:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for labels, value in samples:
+                lines.append(f'{name}{{{_labels(**labels)}}} {value}' if labels else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram_lines(lines: list, name: str, help_text: str, series: list):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += int(count)
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {total / 1e3:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
@@ -0,0 +1,175 @@
+"""
+One-time password storage.
+
+MemoryOTPStore keeps codes in a dict with a heap ordered by expiry, so
+expired codes are swept in O(log n) each without scanning, and the number
+of live codes is capped. SQLiteOTPStore keeps them in a SQLite file that
+every worker process opens, so a code sent by one worker can be verified
+by another. Both implement the same put/verify interface.
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+
+# verify() outcomes
+VERIFIED = 'verified'
+MISSING = 'missing'
+EXPIRED = 'expired'
+LOCKED = 'locked'
+INVALID = 'invalid'
+
+CAP_CHECK_INTERVAL = 64
+
+
+class MemoryOTPStore:
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._codes = {}
+        self._expiry = []
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, email: str, otp: str, ttl: float, coalesce: float = 0, max_attempts: int = 3) -> bool:
+        """Store a new code for `email`, replacing any earlier one.
+
+        Returns False, keeping the earlier code, if that code was issued
+        (with the same ttl) less than `coalesce` seconds ago and is not
+        locked by `max_attempts` wrong guesses.
+        """
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._sweep(now)
+            entry = self._codes.get(email)
+            if entry is not None and entry[1] - ttl > now - coalesce and entry[2] < max_attempts:
+                return False
+            self._codes[email] = [otp, expires_at, 0]
+            heapq.heappush(self._expiry, (expires_at, email))
+            while len(self._codes) > self.max_entries:
+                self._pop_earliest()
+                self.evictions += 1
+            # Replaced codes leave stale heap entries behind; rebuild once they dominate
+            if len(self._expiry) > 2 * len(self._codes) + 64:
+                self._expiry = [(entry[1], key) for key, entry in self._codes.items()]
+                heapq.heapify(self._expiry)
+        return True
+
+    def verify(self, email: str, otp: str, max_attempts: int = 3):
+        """(outcome, attempts_remaining); the code is consumed when verified, expired or locked"""
+        now = time.time()
+        with self._lock:
+            entry = self._codes.get(email)
+            self._sweep(now)
+            if entry is None:
+                return MISSING, 0
+            code, expires_at, attempts = entry
+            if now > expires_at:
+                return EXPIRED, 0
+            if attempts >= max_attempts:
+                del self._codes[email]
+                return LOCKED, 0
+            if code == otp:
+                del self._codes[email]
+                return VERIFIED, max_attempts - attempts
+            entry[2] += 1
+            return INVALID, max_attempts - entry[2]
+
+    def _pop_earliest(self):
+        expires_at, email = heapq.heappop(self._expiry)
+        entry = self._codes.get(email)
+        if entry is not None and entry[1] == expires_at:
+            del self._codes[email]
+
+    def _sweep(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            self._pop_earliest()
+
+    def __len__(self):
+        return len(self._codes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'backend': 'memory', 'size': len(self._codes), 'max_entries': self.max_entries, 'evictions': self.evictions}
+
+
+class SQLiteOTPStore:
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS otp ('
+                'email TEXT PRIMARY KEY, otp TEXT NOT NULL, expires_at REAL NOT NULL, attempts INTEGER NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS otp_expires_at ON otp (expires_at)')
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def put(self, email: str, otp: str, ttl: float, coalesce: float = 0, max_attempts: int = 3) -> bool:
+        now = time.time()
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM otp WHERE expires_at <= ?', (now,))
+            if coalesce > 0 and db.execute(
+                'SELECT 1 FROM otp WHERE email = ? AND expires_at - ? > ? AND attempts < ?',
+                (email, ttl, now - coalesce, max_attempts),
+            ).fetchone():
+                db.execute('COMMIT')
+                return False
+            db.execute('INSERT OR REPLACE INTO otp VALUES (?, ?, ?, 0)', (email, otp, now + ttl))
+            # Counting is a full index scan, so the size cap is enforced every CAP_CHECK_INTERVAL writes
+            self._local.writes = getattr(self._local, 'writes', 0) + 1
+            if self._local.writes % CAP_CHECK_INTERVAL == 0:
+                excess = db.execute('SELECT COUNT(*) FROM otp').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    db.execute('DELETE FROM otp WHERE email IN (SELECT email FROM otp ORDER BY expires_at LIMIT ?)', (excess,))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return True
+
+    def verify(self, email: str, otp: str, max_attempts: int = 3):
+        now = time.time()
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT otp, expires_at, attempts FROM otp WHERE email = ?', (email,)).fetchone()
+            if row is None:
+                result = MISSING, 0
+            else:
+                code, expires_at, attempts = row
+                if now > expires_at:
+                    result = EXPIRED, 0
+                elif attempts >= max_attempts:
+                    result = LOCKED, 0
+                elif code == otp:
+                    result = VERIFIED, max_attempts - attempts
+                else:
+                    result = INVALID, max_attempts - attempts - 1
+                if result[0] == INVALID:
+                    db.execute('UPDATE otp SET attempts = attempts + 1 WHERE email = ?', (email,))
+                else:
+                    db.execute('DELETE FROM otp WHERE email = ?', (email,))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return result
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM otp').fetchone()[0]
+
+    def stats(self) -> dict:
+        return {'backend': 'sqlite', 'size': len(self), 'max_entries': self.max_entries}
@@ -0,0 +1,172 @@
+"""
+In-process sampling profiler for individual requests.
+
+A profiled request registers its thread with the Profiler; one daemon
+thread samples the stacks of all registered threads (sys._current_frames)
+every `interval` seconds while any are registered, and sleeps otherwise.
+When the request finishes its samples are written to one file in
+`directory`: collapsed stacks ("frame;frame;frame microseconds" lines,
+the input of flamegraph.pl and speedscope) or a speedscope JSON profile. Files are
+named <endpoint>-<timestamp>-<ms>ms-<id>, so the collapsed files of one
+endpoint can be concatenated into a single flame graph, and only the
+newest `max_files` are kept.
+
+Sampling needs the GIL, which a thread running Python only gives up every
+sys.getswitchinterval() (5 ms by default), so while any request is being
+profiled the switch interval is lowered to the sampling interval. Each
+sample is weighted by the time since the previous one, so totals stay
+right. Work done in other processes (the resume parse pool, scoring
+workers) shows up as time waiting on them.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+FORMATS = {'collapsed': '.collapsed', 'speedscope': '.speedscope.json'}
+
+
+def _frame_name(code) -> str:
+    # Parent directory too, so flask/app.py and our app.py stay apart
+    path = os.path.join(os.path.basename(os.path.dirname(code.co_filename)), os.path.basename(code.co_filename))
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+class Session:
+    """Samples taken from one thread: root-first stacks of code objects, weighted in seconds"""
+
+    def __init__(self, thread_id: int, endpoint: str, fmt: str):
+        self.thread_id = thread_id
+        self.endpoint = endpoint
+        self.format = fmt
+        self.started = self.last = time.perf_counter()
+        self.samples = Counter()
+        self.path = None
+
+
+class Profiler:
+    def __init__(self, directory: str, interval: float = 0.001, max_files: int = 200):
+        self.directory = directory
+        self.interval = interval
+        self.max_files = max_files
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+        self.profiled = 0
+
+    def start(self, endpoint: str, fmt: str = 'collapsed') -> Session:
+        """Begin sampling the calling thread"""
+        session = Session(threading.get_ident(), endpoint, fmt if fmt in FORMATS else 'collapsed')
+        with self._lock:
+            self._sessions[session.thread_id] = session
+            if self._switch_interval is None:
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return session
+
+    def stop(self, session: Session) -> str:
+        """Stop sampling and write the profile; returns the file path ('' when writing failed)"""
+        with self._lock:
+            self._sessions.pop(session.thread_id, None)
+            self.profiled += 1
+            if not self._sessions and self._switch_interval is not None:
+                sys.setswitchinterval(self._switch_interval)
+                self._switch_interval = None
+        elapsed = time.perf_counter() - session.started
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{session.endpoint}-{time.strftime('%Y%m%dT%H%M%S')}-{elapsed * 1e3:.0f}ms-{uuid.uuid4().hex[:8]}"
+            session.path = os.path.join(self.directory, name + FORMATS[session.format])
+            if session.format == 'speedscope':
+                body = json.dumps(self._speedscope(session, elapsed, name))
+            else:
+                body = ''.join(
+                    f"{';'.join(_frame_name(code) for code in stack)} {round(seconds * 1e6)}\n"
+                    for stack, seconds in session.samples.items()
+                )
+            with open(session.path, 'w') as f:
+                f.write(body)
+            self._prune()
+        except OSError as e:
+            print(f"Failed to write profile to {self.directory}: {e}")
+            return ''
+        return session.path
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'active': len(self._sessions), 'profiled': self.profiled, 'directory': self.directory}
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Under the lock, so stop() never sees a session's samples change
+            with self._lock:
+                if not self._sessions:
+                    self._wake.clear()
+                    continue
+                frames = sys._current_frames()
+                now = time.perf_counter()
+                for session in self._sessions.values():
+                    frame = frames.get(session.thread_id)
+                    stack = []
+                    while frame is not None:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    if stack:
+                        stack.reverse()
+                        session.samples[tuple(stack)] += now - session.last
+                        session.last = now
+                del frames
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _speedscope(session: Session, elapsed: float, name: str) -> dict:
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, seconds in session.samples.items():
+            ids = []
+            for code in stack:
+                if code not in index:
+                    index[code] = len(frames)
+                    frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+                ids.append(index[code])
+            samples.append(ids)
+            weights.append(seconds)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'pm-internship profiler',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': session.endpoint,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': elapsed,
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+
+    def _prune(self):
+        """Delete the oldest profiles beyond max_files"""
+        suffixes = tuple(FORMATS.values())
+        entries = [e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith(suffixes)]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,61 @@
+"""
+Token-bucket rate limiting keyed by client (email address, IP, ...).
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Each key may spend `burst` requests at once, refilled at `rate` per second.
+
+    Buckets are kept for at most `max_keys` keys (least recently used are
+    dropped, which only forgives their history), so memory stays bounded
+    however many distinct keys show up.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    def allow(self, key: str):
+        """Spend one token: (True, 0) or (False, seconds until a token is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                self.throttled += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return True, 0
+        return False, math.ceil((1 - tokens) / self.rate)
+
+    def refund(self, key: str):
+        """Give back the token of a request that turned out to cost nothing"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, last = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + 1), last)
+                self.allowed -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'keys': len(self._buckets),
+                'allowed': self.allowed,
+                'throttled': self.throttled,
+            }
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Bulk recommendations from the command line.
+
+Reads NDJSON profiles (one {"location", "skills", "sectors", "education"}
+object per line, optionally with an "id") and writes one NDJSON result per
+profile, the same format as POST /api/recommend/batch.
+
+Usage: python recommend_batch.py [profiles.ndjson] [results.ndjson]
+       (stdin / stdout when omitted; set SCORING_WORKERS to use several cores)
+"""
+
+import sys
+import time
+
+from app import catalog, iter_batch_recommendations, scoring_pool
+
+
+def main():
+    source = open(sys.argv[1], encoding='utf-8') if len(sys.argv) > 1 else sys.stdin
+    target = open(sys.argv[2], 'wb') if len(sys.argv) > 2 else sys.stdout.buffer
+    start = time.perf_counter()
+    count = 0
+    pool = scoring_pool(catalog)
+    try:
+        with source, target:
+            for chunk in iter_batch_recommendations(source, catalog, pool=pool):
+                target.write(chunk)
+                count += chunk.count(b'\n')
+    finally:
+        if pool is not None:
+            pool.release()
+            pool.close()
+    elapsed = time.perf_counter() - start
+    print(f"Scored {count} profiles in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} profiles/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Resume text and profile extraction.
+
+Text extraction runs in a small process pool (ParsePool) so a large or
+malformed PDF never ties up a request thread: jobs are capped in pages,
+characters and wall time, and a full queue is reported as ParserBusy
+instead of piling up requests.
+
+All vocabulary terms (skills, locations, degrees) are compiled into one
+regular expression shaped like a trie, so a single left-to-right pass over
+the text finds every term and the cost per character depends on the text,
+not on how many terms there are. Terms only match as whole words: "ai"
+no longer matches inside "maintain".
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+try:
+    from PyPDF2 import PdfReader
+except Exception:
+    PdfReader = None
+try:
+    import docx
+except Exception:
+    docx = None
+
+from catalog import Catalog
+
+SKILLS = [
+    'javascript', 'react', 'node.js', 'mongodb', 'python', 'java', 'html', 'css', 'express',
+    'machine learning', 'ai', 'data analysis', 'sql', 'nosql', 'aws', 'docker', 'kubernetes',
+    'git', 'rest api', 'project management', 'analytical thinking', 'communication', 'leadership',
+]
+LOCATIONS = ['delhi', 'bangalore', 'hyderabad', 'jaipur', 'mumbai', 'chennai', 'pune', 'kolkata', 'ahmedabad', 'gurgaon', 'noida', 'remote']
+DEGREES = ['bachelor', 'master', 'phd', 'b.tech', 'm.tech', 'b.e.', 'm.e.', 'bsc', 'msc', 'ba', 'ma', 'mbbs', 'bca', 'mca']
+
+DEFAULT_LOCATION = 'remote'
+DEFAULT_EDUCATION = 'bachelor'
+# Terms this short ("C", "Go", "BA", "AI") are ordinary words in lower case, so they match case-sensitively
+SHORT_TERM = 2
+
+EXPERIENCE_PATTERNS = [
+    re.compile(r'(\d+)\s*(years?|yrs?)'),
+    re.compile(r'experience.*?(\d+)'),
+    re.compile(r'(\d+)\+?\s*years?'),
+]
+_SPACES = re.compile(r'\s+')
+
+
+def _term_key(term: str) -> str:
+    return _SPACES.sub(' ', term.strip().lower())
+
+
+def _trie_pattern(terms) -> str:
+    """Regex alternation with shared prefixes factored out; longer terms win over their prefixes"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node) -> str:
+        ends = '' in node
+        branches = [
+            (r'\s+' if ch == ' ' else re.escape(ch)) + emit(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends:
+            return (body + '?') if len(branches) == 1 and len(body) == 1 else '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+
+class ProfileExtractor:
+    def __init__(self, skills=(), locations=(), degrees=(), version: str = ''):
+        self.version = version
+        self.kinds = {}
+        short = set()
+        for kind, terms in (('skill', skills), ('location', locations), ('education', degrees)):
+            for term in terms:
+                key = _term_key(str(term))
+                if not key:
+                    continue
+                self.kinds.setdefault(key, set()).add(kind)
+                if len(key) <= SHORT_TERM:
+                    short.add(key.upper() if str(term).strip().islower() else str(term).strip())
+        long_terms = [key for key in self.kinds if len(key) > SHORT_TERM]
+        alternatives = []
+        if long_terms:
+            alternatives.append('(?i:' + _trie_pattern(long_terms) + ')')
+        if short:
+            alternatives.append(_trie_pattern(short))
+        self.pattern = re.compile(r'(?<!\w)(?:' + '|'.join(alternatives or ['(?!)']) + r')(?!\w)')
+
+    @classmethod
+    def from_catalog(cls, catalog: Catalog) -> 'ProfileExtractor':
+        """Built-in vocabulary plus every skill, location and education value in the dataset"""
+        return cls(
+            SKILLS + list(catalog.skill_names),
+            LOCATIONS + list(catalog.location_names.values),
+            DEGREES + list(catalog.education_names.values),
+            catalog.version,
+        )
+
+    def extract(self, text: str) -> dict:
+        text = text or ''
+        skills = {}
+        location = education = None
+        for match in self.pattern.finditer(text):
+            key = _term_key(match.group())
+            kinds = self.kinds.get(key, ())
+            if 'skill' in kinds:
+                skills.setdefault(key, None)
+            if location is None and 'location' in kinds:
+                location = key
+            if education is None and 'education' in kinds:
+                education = key
+
+        text_lc = text.lower()
+        exp = 0
+        for pattern in EXPERIENCE_PATTERNS:
+            m = pattern.search(text_lc)
+            if m:
+                exp = int(m.group(1))
+                break
+        return {
+            'skills': list(skills),
+            'location': location or DEFAULT_LOCATION,
+            'experience': exp,
+            'education': education or DEFAULT_EDUCATION,
+        }
+
+
+def text_format(filename: str) -> str:
+    """Which extractor a file name selects: 'pdf', 'docx' or 'text'"""
+    filename = (filename or '').lower()
+    if filename.endswith('.pdf') and PdfReader is not None:
+        return 'pdf'
+    if (filename.endswith('.docx') or filename.endswith('.doc')) and docx is not None:
+        return 'docx'
+    return 'text'
+
+
+def extract_text(filename: str, content: bytes, max_pages: int, max_chars: int, time_limit: float) -> str:
+    """Text of a PDF, DOCX or plain-text resume; page by page, stopping at the page, size or time cap"""
+    deadline = time.monotonic() + time_limit
+    kind = text_format(filename)
+    parts = []
+    collected = 0
+    try:
+        if kind == 'pdf':
+            try:
+                reader = PdfReader(BytesIO(content))
+                for number, page in enumerate(reader.pages):
+                    if number >= max_pages or collected >= max_chars or time.monotonic() > deadline:
+                        break
+                    page_text = (page.extract_text() or '') + '\n'
+                    parts.append(page_text)
+                    collected += len(page_text)
+            except Exception:
+                parts = []
+        elif kind == 'docx':
+            try:
+                document = docx.Document(BytesIO(content))
+                for paragraph in document.paragraphs:
+                    if collected >= max_chars or time.monotonic() > deadline:
+                        break
+                    parts.append(paragraph.text)
+                    collected += len(paragraph.text) + 1
+                return '\n'.join(parts)[:max_chars]
+            except Exception:
+                parts = []
+        else:
+            # Fallback: treat as plain text
+            return content[:max_chars * 4].decode('utf-8', errors='ignore')[:max_chars]
+    except Exception:
+        parts = []
+    return ''.join(parts)[:max_chars]
+
+
+def _extract_submitted(submitted: float, filename: str, content: bytes, max_pages: int, max_chars: int, time_limit: float) -> str:
+    """extract_text() in a pool worker, with the time limit counted from submission rather than start"""
+    remaining = time_limit - (time.time() - submitted)
+    if remaining <= 0:
+        raise TimeoutError('resume parse job expired in the queue')
+    return extract_text(filename, content, max_pages, max_chars, remaining)
+
+
+class ParserBusy(Exception):
+    pass
+
+
+class ParsePool:
+    """Bounded pool for extract_text(); at most workers + queue_size jobs are accepted at once"""
+
+    def __init__(self, workers: int, queue_size: int, timeout: float, max_pages: int, max_chars: int,
+                 mp_context=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        # How workers are started (a multiprocessing context); None is the platform default
+        self.mp_context = mp_context
+        self.slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self.executor = self._start() if workers > 0 else None
+        self._lock = threading.Lock()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context)
+
+    def extract_text(self, filename: str, content: bytes) -> str:
+        """Raises ParserBusy when the queue is full, TimeoutError when a job overruns and
+        BrokenProcessPool when its workers die twice"""
+        if self.executor is None:
+            if not self.slots.acquire(blocking=False):
+                raise ParserBusy()
+            try:
+                return extract_text(filename, content, self.max_pages, self.max_chars, self.timeout)
+            finally:
+                self.slots.release()
+        submitted = time.time()
+        try:
+            return self._run(submitted, filename, content)
+        except BrokenProcessPool:
+            # Most likely killed along with another job's stuck or crashed worker; the workers are fresh now
+            if time.time() - submitted >= self.timeout:
+                raise TimeoutError()
+            return self._run(submitted, filename, content)
+
+    def _run(self, submitted: float, filename: str, content: bytes) -> str:
+        if not self.slots.acquire(blocking=False):
+            raise ParserBusy()
+        executor = self.executor
+        try:
+            future = executor.submit(_extract_submitted, submitted, filename, content,
+                                     self.max_pages, self.max_chars, self.timeout)
+        except Exception:
+            self.slots.release()
+            raise
+        # The slot is held until the job finishes or its worker is killed, whichever comes first
+        once = threading.Lock()
+
+        def release(_=None):
+            if once.acquire(blocking=False):
+                self.slots.release()
+
+        future.add_done_callback(release)
+        try:
+            # Jobs stop themselves between pages once their time since submission runs out;
+            # the grace covers one slow page
+            return future.result(timeout=max(submitted + self.timeout + 2 - time.time(), 0))
+        except TimeoutError:
+            # Cancelling a queued job releases its slot; one still running is stuck inside a page
+            if not future.cancel() and not future.done():
+                self._recycle(executor)
+                release()
+            raise
+        except BrokenProcessPool:
+            self._recycle(executor)
+            raise
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Replace `executor` with fresh workers and kill its own; other jobs it holds fail as BrokenProcessPool"""
+        with self._lock:
+            if self.executor is not executor:
+                return
+            self.executor = self._start()
+        # The executor has no public way to stop a running job
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
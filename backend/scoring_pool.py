@@ -0,0 +1,150 @@
+"""
+Multi-process recommendation scoring.
+
+Worker processes memory-map the same catalog snapshot, so the columns live
+once in the page cache instead of being pickled to every worker. Work is
+split either by user (batches: each worker ranks a slice of the profiles
+against the whole catalog) or by catalog rows (large catalogs: each worker
+ranks every profile against a row range and the per-shard top-k lists are
+merged). Workers use the pruned Catalog.rank(), and ties are broken on the
+global id order, so both splits return exactly what Catalog.rank_many()
+returns in-process.
+
+Requests hold the pool with acquire()/release(); close() retires it, and
+the workers are shut down (and the pool's snapshot deleted) once the last
+holder releases it, so a dataset reload never cuts off work in flight.
+"""
+
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from catalog import Catalog
+
+_worker_catalog = None
+
+
+def _load_worker_catalog(snapshot_path: str):
+    global _worker_catalog
+    _worker_catalog = Catalog.load_snapshot(snapshot_path)
+
+
+def _rank_users(users: list, top_k_local: int, top_k_overall: int, start: int, stop: int) -> list:
+    return [_worker_catalog.rank(user, top_k_local, top_k_overall, start=start, stop=stop) for user in users]
+
+
+def snapshot_for(catalog: Catalog, directory: str = None, published: str = None) -> str:
+    """A snapshot file of this catalog version for one pool; the pool deletes it when done.
+
+    When `published` (the configured snapshot) holds this version it is hard-linked,
+    not copied, and publishing a new one later leaves the link unchanged.
+    """
+    name = f'pm_catalog_{catalog.version}_{uuid.uuid4().hex[:8]}.catalog'
+    if published and os.path.exists(published):
+        path = os.path.join(os.path.dirname(os.path.abspath(published)), '.' + name)
+        try:
+            os.link(published, path)
+        except OSError:
+            pass
+        else:
+            try:
+                if Catalog.load_snapshot(path).version == catalog.version:
+                    return path
+            except (OSError, ValueError):
+                pass
+            os.remove(path)
+    path = os.path.join(directory or tempfile.gettempdir(), name)
+    catalog.save_snapshot(path)
+    return path
+
+
+class ScoringPool:
+    def __init__(self, catalog: Catalog, workers: int, snapshot_dir: str = None, published: str = None,
+                 mp_context=None):
+        self.catalog = catalog
+        self.workers = workers
+        # How workers are started (a multiprocessing context); None is the platform default
+        self.mp_context = mp_context
+        self.snapshot_path = snapshot_for(catalog, snapshot_dir, published)
+        self.executor = self._start()
+        self._lock = threading.Lock()
+        self._holders = 0
+        self._closed = False
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self.mp_context,
+            initializer=_load_worker_catalog, initargs=(self.snapshot_path,),
+        )
+
+    @property
+    def version(self) -> str:
+        return self.catalog.version
+
+    def acquire(self) -> 'ScoringPool':
+        with self._lock:
+            self._holders += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._holders -= 1
+            done = self._closed and self._holders == 0
+        if done:
+            self._shutdown()
+
+    def close(self):
+        """Retire the pool: it shuts down once every holder has released it"""
+        with self._lock:
+            self._closed = True
+            done = self._holders == 0
+        if done:
+            self._shutdown()
+
+    def _shutdown(self):
+        # Nothing is queued once the last holder is gone, so there is nothing to cancel
+        self.executor.shutdown(wait=False)
+        try:
+            os.remove(self.snapshot_path)
+        except OSError:
+            pass
+
+    def _run(self, tasks: list):
+        """Results of _rank_users for each argument tuple, or None when the workers cannot take the work"""
+        try:
+            futures = [self.executor.submit(_rank_users, *args) for args in tasks]
+            return [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            print(f"Scoring workers failed ({e}); scoring in-process")
+            with self._lock:
+                if not self._closed:
+                    self.executor = self._start()
+        except RuntimeError as e:
+            print(f"Scoring pool unavailable ({e}); scoring in-process")
+        return None
+
+    def rank_many(self, users: list, top_k_local: int = 5, top_k_overall: int = 10) -> list:
+        """Split the profiles across workers; each ranks its slice against every row"""
+        if len(users) < 2 * self.workers:
+            return self.catalog.rank_many(users, top_k_local, top_k_overall)
+        bounds = np.linspace(0, len(users), self.workers + 1).astype(int)
+        results = self._run([(users[lo:hi], top_k_local, top_k_overall, 0, None) for lo, hi in zip(bounds, bounds[1:])])
+        if results is None:
+            return self.catalog.rank_many(users, top_k_local, top_k_overall)
+        return [ranked for result in results for ranked in result]
+
+    def rank_sharded(self, users: list, top_k_local: int = 5, top_k_overall: int = 10) -> list:
+        """Split the catalog rows across workers and merge the per-shard top-k lists"""
+        bounds = np.linspace(0, self.catalog.size, self.workers + 1).astype(int)
+        results = self._run([(users, top_k_local, top_k_overall, int(lo), int(hi)) for lo, hi in zip(bounds, bounds[1:])])
+        if results is None:
+            return self.catalog.rank_many(users, top_k_local, top_k_overall)
+        return self.catalog.merge_ranked(results, top_k_local, top_k_overall)
+
+    def rank(self, user: dict, top_k_local: int = 5, top_k_overall: int = 10):
+        return self.rank_sharded([user], top_k_local, top_k_overall)[0]
@@ -16,12 +16,31 @@ export const internshipAPI = {
     return response.data;
   },
 
+  // Filtered page with match count and facet counts: { total, facets, items }
+  queryInternships: async (filters = {}) => {
+    const response = await api.get('/internships', { params: { ...filters, envelope: 1 } });
+    return response.data;
+  },
+
   // Get internship by ID
   getInternship: async (id) => {
     const response = await api.get(`/internships/${id}`);
     return response.data;
   },
 
+  // Get several internships in one round trip
+  getInternshipsByIds: async (ids = []) => {
+    if (!ids.length) return [];
+    const response = await api.get('/internships', { params: { ids: ids.join(',') } });
+    return response.data;
+  },
+
+  // Keyword search, best match first: { query, total, items }
+  searchInternships: async (q, { page = 1, limit = 20 } = {}) => {
+    const response = await api.get('/search', { params: { q, page, limit } });
+    return response.data;
+  },
+
   // Upload resume and get analysis
   uploadResume: async (formData) => {
     const response = await api.post('/upload-resume', formData, {